@@ -12,21 +12,32 @@ Python Version: 3.6+
 import os
 import sys
 import json
+import re
 import time
 import shutil
 import subprocess
 import uuid
+import fnmatch
 import hashlib
+import random
+import heapq
 import threading
 import tempfile
 import zipfile
+import zlib
+import struct
+import io
 import sqlite3
 import ctypes
 import webbrowser
 from ctypes import wintypes
 from pathlib import Path
+from collections import deque
+from contextlib import closing
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, TextIO, Tuple
 import logging
 
 # GUI imports
@@ -54,10 +65,1903 @@ except ImportError:
     print("Warning: winreg not available. Limited registry access.")
     WINREG_AVAILABLE = False
 
+# Copy-on-write file clones (Linux FICLONE ioctl)
+try:
+    import fcntl
+    REFLINK_AVAILABLE = sys.platform.startswith('linux')
+except ImportError:
+    REFLINK_AVAILABLE = False
+FICLONE = 0x40049409
+# Windows junctions and directory symlinks carry this attribute; deletion
+# removes the link itself and never descends into its target
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+# Deletion failures logged individually per tree; the rest are counted
+DELETE_ERRORS_LOGGED = 20
+# Removed folders are renamed to hidden tombstones beside them, so the
+# rename stays on one volume, and purged by a low-priority thread. The
+# journal sits next to the backup catalog, outside anything a removal or
+# cleanup deletes; earlier versions kept it with the logs in Temp
+TOMBSTONE_PREFIX = ".vscode_removal_tombstone_"
+TOMBSTONE_JOURNAL_NAME = "VSCode_Tombstones.json"
+PURGE_WORKERS = 2
+THREAD_PRIORITY_LOWEST = -2
+PURGE_NICENESS = 10
+
+# Backup storage settings
+BACKUP_MODES = ('full', 'store', 'incremental', 'archive', 'snapshot')
+HASH_ALGORITHM = 'sha256'
+COPY_CHUNK_SIZE = 1024 * 1024
+DEFAULT_COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+ARCHIVE_NAME = "backup.zip"
+
+# Files the tool rewrites, relative to a product's User folder; snapshots always copy them
+MACHINE_ID_FILES = (Path("globalStorage") / "storage.json", Path("state.vscdb"))
+
+# Sampled verification checks at least this many files: enough to catch
+# 1% corruption with 95% confidence, since 1 - 0.99 ** 300 > 0.95
+VERIFY_MIN_SAMPLE = 300
+VERIFY_SAMPLE_RATE = 0.05
+DEFAULT_VERIFY_WORKERS = os.cpu_count() or 1
+
+# Products the tool knows about. Folders are (environment variable, relative
+# path) and registry keys (hive name, key path); adding a product here needs
+# no extra discovery code or disk scan.
+PRODUCT_PROFILES = {
+    'vscode': {
+        'name': "Visual Studio Code",
+        'install_dirs': [
+            ('LOCALAPPDATA', r"Programs\Microsoft VS Code"),
+            ('PROGRAMFILES', "Microsoft VS Code"),
+            ('PROGRAMFILES(X86)', "Microsoft VS Code"),
+        ],
+        'data_dirs': [('APPDATA', "Code"), ('USERPROFILE', ".vscode")],
+        'cache_dirs': [('LOCALAPPDATA', r"Microsoft\VSCode")],
+        'process_names': ['Code.exe'],
+        'temp_patterns': ['vscode', 'vscode-stable-*', 'CodeSetup-stable-*', 'VSCodeSetup-*', 'VSCodeUserSetup-*'],
+        'registry_keys': [
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\Applications\Code.exe"),
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\vscode"),
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Microsoft\VSCode"),
+            ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Classes\Applications\Code.exe"),
+            ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Classes\vscode"),
+        ],
+        'uninstall_names': ["Microsoft Visual Studio Code", "Visual Studio Code"],
+    },
+    'vscode-insiders': {
+        'name': "Visual Studio Code - Insiders",
+        'install_dirs': [
+            ('LOCALAPPDATA', r"Programs\Microsoft VS Code Insiders"),
+            ('PROGRAMFILES', "Microsoft VS Code Insiders"),
+        ],
+        'data_dirs': [('APPDATA', "Code - Insiders"), ('USERPROFILE', ".vscode-insiders")],
+        'cache_dirs': [],
+        'process_names': ['Code - Insiders.exe'],
+        'temp_patterns': ['vscode-insider-*', 'CodeSetup-insider-*'],
+        'registry_keys': [
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\Applications\Code - Insiders.exe"),
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\vscode-insiders"),
+        ],
+        'uninstall_names': ["Microsoft Visual Studio Code - Insiders", "Visual Studio Code - Insiders"],
+    },
+    'vscodium': {
+        'name': "VSCodium",
+        'install_dirs': [('LOCALAPPDATA', r"Programs\VSCodium"), ('PROGRAMFILES', "VSCodium")],
+        'data_dirs': [('APPDATA', "VSCodium"), ('USERPROFILE', ".vscode-oss")],
+        'cache_dirs': [],
+        'process_names': ['VSCodium.exe'],
+        'temp_patterns': ['vscodium-*', 'VSCodiumSetup-*', 'VSCodiumUserSetup-*'],
+        'registry_keys': [
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\Applications\VSCodium.exe"),
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\vscodium"),
+        ],
+        'uninstall_names': ["VSCodium"],
+    },
+    'code-oss': {
+        'name': "Code - OSS",
+        'install_dirs': [('LOCALAPPDATA', r"Programs\Code - OSS")],
+        'data_dirs': [('APPDATA', "Code - OSS"), ('APPDATA', "code-oss-dev"), ('USERPROFILE', ".vscode-oss-dev")],
+        'cache_dirs': [],
+        'process_names': ['Code - OSS.exe'],
+        'temp_patterns': ['code-oss-*'],
+        'registry_keys': [("HKEY_CURRENT_USER", r"SOFTWARE\Classes\code-oss")],
+        'uninstall_names': ["Code - OSS"],
+    },
+    'cursor': {
+        'name': "Cursor",
+        'install_dirs': [('LOCALAPPDATA', r"Programs\cursor")],
+        'data_dirs': [('APPDATA', "Cursor"), ('USERPROFILE', ".cursor")],
+        'cache_dirs': [],
+        'process_names': ['Cursor.exe'],
+        'temp_patterns': ['cursor-updater*', 'CursorSetup-*', 'CursorUserSetup-*'],
+        'registry_keys': [
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\Applications\Cursor.exe"),
+            ("HKEY_CURRENT_USER", r"SOFTWARE\Classes\cursor"),
+        ],
+        'uninstall_names': ["Cursor"],
+    },
+}
+# Products handled unless others are selected
+DEFAULT_PRODUCTS = ('vscode', 'vscode-insiders')
+# Multi-user sweeps: where home folders live and which entries are not users
+DEFAULT_USERS_ROOT = os.path.join(os.environ.get('SYSTEMDRIVE', 'C:') + os.sep, "Users")
+SKIPPED_USER_PROFILES = {'public', 'default', 'default user', 'all users', 'defaultapppool', 'wdagutilityaccount'}
+# Profile folders that removal targets must never be or contain
+PROTECTED_PROFILE_FOLDERS = ('USERPROFILE', 'APPDATA', 'LOCALAPPDATA', 'TEMP', 'TMP')
+# Temp entries written by every product: updater logs, TypeScript server
+# logs and the IPC and Git askpass sockets of the extension host
+SHARED_TEMP_PATTERNS = ['vscode-inno-updater-*', 'vscode-typescript*', 'vscode-ipc-*', 'vscode-git-*']
+# Temp entries a running product is still using
+LIVE_TEMP_PATTERNS = ['vscode-ipc-*', 'vscode-git-*']
+# Helper processes only terminated when their executable belongs to a product
+HELPER_PROCESS_NAMES = ['CodeHelper.exe', 'VSCodeSetup.exe', 'electron.exe', 'node.exe']
+# Portable installs keep their data in this folder next to the executable
+PORTABLE_DATA_DIR = "data"
+HIVE_ABBREVIATIONS = {
+    "HKEY_CURRENT_USER": "HKCU",
+    "HKEY_LOCAL_MACHINE": "HKLM",
+    "HKEY_CLASSES_ROOT": "HKCR",
+    "HKEY_USERS": "HKU",
+}
+REGISTRY_SNAPSHOT_NAME = "registry_snapshot.json"
+
+# Registry value types (same numbers as the winreg constants)
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+# Data VSCode regenerates by itself, left out of backups by default
+DEFAULT_BACKUP_EXCLUDES = [
+    'CachedData', 'CachedExtensions', 'CachedExtensionVSIXs', 'CachedProfilesData',
+    'Code Cache', 'GPUCache', 'DawnCache', 'Crashpad', 'CrashDumps', '*.dmp', '*.log'
+]
+
+# Telemetry and crash data removed during Machine ID reset, relative to a user data folder
+TELEMETRY_PATTERNS = [
+    'User/globalStorage/vscode.vscode-telemetry',
+    'User/globalStorage/ms-vscode.vscode-telemetry',
+    '/CrashDumps',
+    '/CachedData'
+]
+
+# Extension payloads that are reinstalled from the marketplace or VSIX cache
+LEAN_SKIP_DIRS = ['node_modules/', 'dist/', 'out/', 'bin/', '.vscode-test/']
+LEAN_PACKAGE_FIELDS = (
+    'name', 'publisher', 'version', 'displayName', 'engines',
+    'extensionDependencies', 'extensionPack', '__metadata'
+)
+# Files touched within this many seconds of installation count as unmodified
+LEAN_MTIME_SLACK = 2.0
+
+# Footprint categories reported by system analysis
+FOOTPRINT_CATEGORIES = ('installs', 'user_data', 'extensions', 'caches', 'workspace_storage')
+# Cache folders inside a user data folder, counted as caches rather than user data
+USER_DATA_CACHE_DIRS = [
+    'Cache', 'CachedData', 'CachedExtensions', 'CachedExtensionVSIXs', 'CachedProfilesData',
+    'Code Cache', 'GPUCache', 'DawnCache', 'Crashpad', 'CrashDumps', 'logs'
+]
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Footprint cache: directories changed this recently are never cached (their
+# mtime may not have ticked yet). Unchanged directories are served from their
+# record, so files grown in place are picked up once their directory changes
+FOOTPRINT_CACHE_NAME = "footprint_cache.db"
+FOOTPRINT_CACHE_VERSION = 4
+FOOTPRINT_CACHE_RACY_WINDOW = 2.0
+# Cache records written per transaction, and directories a scan task
+# measures before handing the rest of an unchanged subtree back to the pool
+FOOTPRINT_CACHE_BATCH = 1000
+FOOTPRINT_TASK_DIRECTORIES = 1000
+# Largest-consumer report: entries per list, and how deep below a root a
+# folder may sit to be reported (extensions, workspaceStorage hashes and
+# CachedData builds are all within three levels of a user data folder)
+TOP_CONSUMERS = 10
+TOP_CONSUMER_DEPTH = 3
+
+# Extension folders are named publisher.name-version, optionally followed by
+# a target platform or pre-release tag (ms-vscode.cpptools-1.20.5-win32-x64)
+EXTENSION_FOLDER_PATTERN = re.compile(r'^(?P<id>[^.]+\..+?)-(?P<version>\d+(?:\.\d+)*)(?P<suffix>-.+)?$')
+
+# Already-compressed content is stored in archives without recompression
+STORED_SUFFIXES = {
+    '.vsix', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.br', '.jar', '.nupkg',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico',
+    '.woff', '.woff2', '.mp3', '.mp4', '.webm', '.pdf'
+}
+
+
+def _copy_and_hash(src: Path, dst: Path, algorithm: str = HASH_ALGORITHM) -> Tuple[str, int]:
+    """Copy a file while hashing it in the same read pass"""
+    digest = hashlib.new(algorithm)
+    size = 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        while True:
+            chunk = fsrc.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            fdst.write(chunk)
+            size += len(chunk)
+    shutil.copystat(src, dst)
+    return digest.hexdigest(), size
+
+
+def _reflink_file(src: Path, dst: Path) -> bool:
+    """Clone a file with copy-on-write where the filesystem supports it"""
+    if not REFLINK_AVAILABLE:
+        return False
+    # Clone under a temporary name: dst may be a hard link to src, which
+    # opening it for writing would truncate
+    partial = dst.with_name(f"{dst.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(src, 'rb') as fsrc, open(partial, 'xb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+    except OSError:
+        if partial.exists():
+            partial.unlink()
+        return False
+    return True
+
+
+def _hash_file(path: Path, algorithm: str = HASH_ALGORITHM) -> str:
+    """Hash a file without copying it"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    """Content-addressed object store shared by all backup sessions"""
+    
+    def __init__(self, root: Path, algorithm: str = HASH_ALGORITHM):
+        self.root = Path(root)
+        self.algorithm = algorithm
+        self.objects_dir = self.root / "objects"
+        self.manifests_dir = self.root / "manifests"
+        self.tmp_dir = self.root / "tmp"
+        
+        for directory in (self.objects_dir, self.manifests_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+    
+    def object_path(self, digest: str) -> Path:
+        """Get the on-disk location of an object"""
+        return self.objects_dir / digest[:2] / digest[2:]
+    
+    def has_object(self, digest: str) -> bool:
+        """Check whether an object is already stored"""
+        return self.object_path(digest).exists()
+    
+    def put_file(self, src: Path) -> Tuple[str, int, bool]:
+        """Store a file, reading it only once, and return (digest, size, written)"""
+        tmp_path = self.tmp_dir / uuid.uuid4().hex
+        try:
+            digest, size = _copy_and_hash(src, tmp_path, self.algorithm)
+            target = self.object_path(digest)
+            if target.exists():
+                return digest, size, False
+            target.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, target)
+            return digest, size, True
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    def restore_file(self, digest: str, dst: Path):
+        """Copy an object back out of the store"""
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.object_path(digest), dst)
+    
+    def save_manifest(self, session_id: str, manifest: Dict):
+        """Keep a copy of a session manifest next to the objects it references"""
+        with open(self.manifests_dir / f"{session_id}.json", 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def latest_manifest(self) -> Optional[Dict]:
+        """The most recently saved readable session manifest, if any"""
+        manifests = sorted(self.manifests_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in manifests:
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+
+class PathRules:
+    """Glob and size rules compiled once and evaluated per directory entry
+    
+    Slash patterns match the path from the walk root, a trailing slash only directories; case is ignored.
+    """
+    
+    def __init__(self, patterns: Iterable[str] = (), keep: Iterable[str] = (),
+                 max_file_size: Optional[int] = None):
+        self.patterns = list(patterns)
+        self.keep = list(keep)
+        self.max_file_size = max_file_size
+        
+        self._name_re, self._path_re = self._compile([p for p in self.patterns if not p.endswith('/')])
+        self._dir_name_re, self._dir_path_re = self._compile(
+            [p.rstrip('/') for p in self.patterns if p.endswith('/') and p.strip('/')]
+        )
+        self._keep_name_re, self._keep_path_re = self._compile(self.keep)
+        
+        # Per-segment regexes of anchored patterns decide which directories can
+        # lead to a match, so find_matches never enters unrelated subtrees
+        self._anchored_segments = self._segments(p.rstrip('/') for p in self.patterns)
+        self._keep_segments = self._segments(self.keep)
+    
+    @staticmethod
+    def _segments(patterns: Iterable[str]) -> List[List["re.Pattern"]]:
+        """Per-segment regexes of the patterns anchored at the walk root"""
+        return [
+            [re.compile(fnmatch.translate(part), re.IGNORECASE) for part in pattern.strip('/').split('/')]
+            for pattern in patterns if '/' in pattern
+        ]
+    
+    @staticmethod
+    def _compile(patterns: List[str]) -> Tuple[Optional["re.Pattern"], Optional["re.Pattern"]]:
+        """Compile name and path patterns into one regex each"""
+        names = [fnmatch.translate(p) for p in patterns if '/' not in p]
+        paths = [fnmatch.translate(p.strip('/')) for p in patterns if '/' in p]
+        name_re = re.compile('|'.join(names), re.IGNORECASE) if names else None
+        path_re = re.compile('|'.join(paths), re.IGNORECASE) if paths else None
+        return name_re, path_re
+    
+    def __bool__(self) -> bool:
+        return bool(self.patterns or self.max_file_size)
+    
+    @property
+    def needs_size(self) -> bool:
+        """Whether matching files needs their size"""
+        return self.max_file_size is not None
+    
+    def is_kept(self, relative: str, name: str) -> bool:
+        """Whether a keep pattern protects an entry"""
+        return bool((self._keep_name_re and self._keep_name_re.match(name))
+                    or (self._keep_path_re and self._keep_path_re.match(relative)))
+    
+    def matches(self, relative: str, name: str, is_dir: bool, size: Optional[int] = None) -> bool:
+        """Check a single directory entry against the rules"""
+        if self.is_kept(relative, name):
+            return False
+        if self._name_re and self._name_re.match(name):
+            return True
+        if self._path_re and self._path_re.match(relative):
+            return True
+        if is_dir:
+            return bool((self._dir_name_re and self._dir_name_re.match(name))
+                        or (self._dir_path_re and self._dir_path_re.match(relative)))
+        return self.max_file_size is not None and size is not None and size > self.max_file_size
+    
+    @staticmethod
+    def _leads_to(segments_list: List[List["re.Pattern"]], relative_dir: str) -> bool:
+        """Whether an anchored pattern can match something below relative_dir"""
+        parts = relative_dir.split('/') if relative_dir else []
+        return any(
+            len(segments) > len(parts) and all(seg.match(part) for seg, part in zip(segments, parts))
+            for segments in segments_list
+        )
+    
+    def may_match_below(self, relative_dir: str) -> bool:
+        """Whether anything below relative_dir can match"""
+        if self._name_re or self._dir_name_re or self.max_file_size is not None:
+            return True
+        return self._leads_to(self._anchored_segments, relative_dir)
+    
+    def may_keep_below(self, relative_dir: str) -> bool:
+        """Whether a keep pattern can protect anything below a matched directory"""
+        return bool(self._keep_name_re) or self._leads_to(self._keep_segments, relative_dir)
+    
+    def extended(self, patterns: Iterable[str]) -> "PathRules":
+        """Copy of these rules with extra patterns"""
+        return PathRules(self.patterns + list(patterns), self.keep, self.max_file_size)
+
+
+def scan_tree(root: Path, rules: Optional[PathRules] = None,
+              errors: Optional[List[Tuple[str, str]]] = None) -> Iterator[Tuple[os.DirEntry, str]]:
+    """Walk a tree with os.scandir, yielding (entry, relative path) for kept entries, directories first"""
+    pending = [(Path(root), "", False)]
+    while pending:
+        directory, relative_dir, excluded = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if rules and not (excluded and rules.is_kept(relative, entry.name)):
+                        size = entry.stat(follow_symlinks=False).st_size if rules.needs_size and not is_dir else None
+                        if excluded or rules.matches(relative, entry.name, is_dir, size):
+                            if is_dir and rules.may_keep_below(relative):
+                                yield entry, relative
+                                pending.append((Path(entry.path), relative, True))
+                            continue
+                    yield entry, relative
+                    if is_dir:
+                        pending.append((Path(entry.path), relative, False))
+        except OSError as e:
+            if errors is not None:
+                errors.append((str(directory), str(e)))
+
+
+def find_matches(root: Path, rules: PathRules,
+                 errors: Optional[List[Tuple[str, str]]] = None) -> Iterator[Tuple[os.DirEntry, str]]:
+    """Yield the topmost entries below root matched by the rules, without descending into them"""
+    pending = [(Path(root), "", False)]
+    while pending:
+        directory, relative_dir, excluded = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    if excluded and rules.is_kept(relative, entry.name):
+                        continue
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    size = entry.stat(follow_symlinks=False).st_size if rules.needs_size and not is_dir else None
+                    if excluded or rules.matches(relative, entry.name, is_dir, size):
+                        if is_dir and rules.may_keep_below(relative):
+                            pending.append((Path(entry.path), relative, True))
+                        else:
+                            yield entry, relative
+                    elif is_dir and rules.may_match_below(relative):
+                        pending.append((Path(entry.path), relative, False))
+        except OSError as e:
+            if errors is not None:
+                errors.append((str(directory), str(e)))
+
+
+class FootprintCache:
+    """SQLite store of footprint records, read and written one directory at a time
+    
+    prune() drops directories the last scan did not write.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS directories (
+            path TEXT PRIMARY KEY,
+            record TEXT NOT NULL,
+            scan INTEGER NOT NULL
+        );
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        # Scan workers look records up concurrently through this one connection
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = []
+        self.error = None
+        with self._lock, self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != FOOTPRINT_CACHE_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS directories")
+                self._conn.execute(f"PRAGMA user_version = {FOOTPRINT_CACHE_VERSION}")
+            self._conn.executescript(self.SCHEMA)
+            self._scan = self._conn.execute("SELECT COALESCE(MAX(scan), 0) + 1 FROM directories").fetchone()[0]
+    
+    def get(self, path: str) -> Optional[list]:
+        """Record of a directory from an earlier scan"""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM directories WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, path: str, record: list):
+        """Remember a directory measured by this scan"""
+        self._pending.append((path, json.dumps(record, separators=(',', ':')), self._scan))
+        if len(self._pending) >= FOOTPRINT_CACHE_BATCH:
+            self._flush()
+    
+    def prune(self):
+        """Forget directories this scan did not write, unless writing failed"""
+        self._flush()
+        if self.error is None:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM directories WHERE scan != ?", (self._scan,))
+    
+    def close(self):
+        """Write pending records and close the database"""
+        self._flush()
+        self._conn.close()
+    
+    def _flush(self):
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)", self._pending)
+        except sqlite3.Error as e:
+            # A cache that cannot be written only costs speed on the next scan
+            self.error = self.error or str(e)
+        self._pending = []
+
+
+class FootprintScanner:
+    """Measure bytes and file counts of several directory trees in parallel, one scandir task per directory
+    
+    Unchanged directories are served from the cache; files grown in place show once their directory changes.
+    """
+    
+    def __init__(self, workers: int = DEFAULT_SCAN_WORKERS, cache: Optional['FootprintCache'] = None):
+        self.workers = max(1, workers)
+        self.cache = cache
+    
+    def scan(self, roots: Dict[str, List[Path]],
+             on_directory: Optional[Callable[[str, str, str, list], None]] = None,
+             consumers: Optional['LargestConsumers'] = None) -> Dict:
+        """Scan roots grouped by category, returning totals per category
+        
+        on_directory(category, root, directory, record) runs on the calling thread as each directory is measured.
+        """
+        totals = {
+            category: {'bytes': 0, 'files': 0, 'directories': 0, 'roots': [str(p) for p in paths]}
+            for category, paths in roots.items()
+        }
+        claimed = {}
+        for category, paths in roots.items():
+            for path in paths:
+                claimed.setdefault(os.path.normcase(os.path.abspath(path)), category)
+        errors = []
+        cached = 0
+        started = time.perf_counter()
+        
+        # Directories wait here until a task slot is free, so at most
+        # max_pending listings are queued on the pool at any time
+        backlog = [(path, category, path) for path, category in claimed.items()]
+        max_pending = self.workers * 4
+        top_files = consumers.top if consumers is not None else 0
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            while backlog or pending:
+                while backlog and len(pending) < max_pending:
+                    path, category, root = backlog.pop()
+                    pending[pool.submit(self._scan_directory, path, claimed, top_files)] = (category, root)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    category, root = pending.pop(future)
+                    records, unscanned, failures = future.result()
+                    errors.extend(failures)
+                    # Directories changed during the scan are not worth remembering
+                    racy = time.time_ns() - int(FOOTPRINT_CACHE_RACY_WINDOW * 1e9)
+                    for directory, record, from_cache, largest in records:
+                        if self.cache is not None and record[0] < racy:
+                            self.cache.put(directory, record)
+                        if on_directory:
+                            on_directory(category, root, directory, record)
+                        if consumers is not None:
+                            consumers.add(directory, record, largest)
+                        cached += from_cache
+                        totals[category]['files'] += record[3]
+                        totals[category]['bytes'] += record[4]
+                        totals[category]['directories'] += 1
+                    backlog.extend((subdirectory, category, root) for subdirectory in unscanned)
+        
+        if consumers is not None:
+            for directory, error in errors:
+                consumers.add_error(directory, error)
+        return {
+            'categories': totals,
+            'total_bytes': sum(t['bytes'] for t in totals.values()),
+            'total_files': sum(t['files'] for t in totals.values()),
+            'cached_directories': cached,
+            'errors': errors,
+            'elapsed': time.perf_counter() - started
+        }
+    
+    def _scan_directory(self, directory: str, claimed: Dict[str, str],
+                        top_files: int = 0) -> Tuple[List, List[str], List[Tuple[str, str]]]:
+        """Measure a directory, returning (records, subdirectories to scan, errors)
+        
+        Records are [mtime_ns, inode, scanned_at, files, bytes, subdirectory names, largest files].
+        """
+        records = []
+        unscanned = []
+        errors = []
+        stack = [directory]
+        while stack:
+            if len(records) >= FOOTPRINT_TASK_DIRECTORIES:
+                unscanned.extend(stack)
+                break
+            current = stack.pop()
+            try:
+                stat = os.stat(current, follow_symlinks=False)
+            except OSError as e:
+                errors.append((current, str(e)))
+                continue
+            
+            record = self.cache.get(current) if self.cache is not None else None
+            if (record and record[6] is not None
+                    and record[0] == stat.st_mtime_ns and record[1] == stat.st_ino
+                    # A longer largest-files list than the record holds needs a fresh listing
+                    and (top_files <= len(record[6]) or record[3] == len(record[6]))):
+                largest = [tuple(item) for item in record[6][:top_files]]
+                records.append((current, [*record[:2], time.time(), *record[3:]], True, largest))
+                stack.extend(self._subdirectories(current, record[5], claimed))
+                continue
+            
+            sizes = []
+            names = []
+            file_names = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                names.append(entry.name)
+                            else:
+                                sizes.append(entry.stat(follow_symlinks=False).st_size)
+                                file_names.append(entry.name)
+                        except OSError:
+                            # Vanished while listing
+                            continue
+            except NotADirectoryError:
+                # A root may be a single file, such as a matched Temp entry
+                records.append((current, [stat.st_mtime_ns, stat.st_ino, time.time(), 1, stat.st_size, [], None],
+                                False, []))
+                continue
+            except OSError as e:
+                errors.append((current, str(e)))
+                continue
+            largest = heapq.nlargest(max(top_files, TOP_CONSUMERS), zip(sizes, file_names))
+            records.append((current, [stat.st_mtime_ns, stat.st_ino, time.time(), len(sizes), sum(sizes), names,
+                                      largest], False, largest[:top_files]))
+            unscanned.extend(self._subdirectories(current, names, claimed))
+        return records, unscanned, errors
+    
+    @staticmethod
+    def _subdirectories(directory: str, names: List[str], claimed: Dict[str, str]) -> List[str]:
+        """Subdirectory paths, leaving out nested roots that are scanned on their own"""
+        paths = (os.path.join(directory, name) for name in names)
+        return [path for path in paths if os.path.normcase(path) not in claimed]
+
+
+class LargestConsumers:
+    """Largest subtrees and files below a set of roots, fed by the footprint scan
+    
+    Subtree sizes are kept up to max_depth below a root, and files go through bounded heaps.
+    """
+    
+    def __init__(self, roots: Iterable[Path], top: int = TOP_CONSUMERS, max_depth: int = TOP_CONSUMER_DEPTH):
+        self.top = max(1, top)
+        self.max_depth = max(1, max_depth)
+        self._order = [(os.path.normcase(os.path.abspath(root)), str(root)) for root in roots]
+        # Deepest roots first, so a directory belongs to the innermost root containing it
+        self._roots = sorted(self._order, key=lambda item: -len(item[0]))
+        self._totals = {key: {'bytes': 0, 'files': 0, 'subtrees': {}, 'largest_files': [], 'errors': []}
+                        for key, _ in self._roots}
+    
+    def _offer(self, heap: List[Tuple[int, str]], size: int, path: str):
+        """Keep the largest entries seen so far"""
+        if len(heap) < self.top:
+            heapq.heappush(heap, (size, path))
+        elif size > heap[0][0]:
+            heapq.heappushpop(heap, (size, path))
+    
+    def _locate(self, path: str) -> Optional[Tuple[str, str, List[str]]]:
+        """(root key, root path, parts below the root) of the root containing a path"""
+        key = os.path.normcase(os.path.abspath(path))
+        for root_key, root in self._roots:
+            if key == root_key:
+                return root_key, root, []
+            if key.startswith(root_key.rstrip(os.sep) + os.sep):
+                return root_key, root, os.path.relpath(path, root).split(os.sep)
+        return None
+    
+    def add(self, directory: str, record: list, largest: List[Tuple[int, str]]):
+        """Count a directory measured by the footprint scan"""
+        located = self._locate(directory)
+        if located is None:
+            return
+        root_key, root, parts = located
+        totals = self._totals[root_key]
+        totals['bytes'] += record[4]
+        totals['files'] += record[3]
+        for depth in range(1, min(len(parts), self.max_depth) + 1):
+            subtree = os.path.join(root, *parts[:depth])
+            totals['subtrees'][subtree] = totals['subtrees'].get(subtree, 0) + record[4]
+        for size, name in largest:
+            self._offer(totals['largest_files'], size, os.path.join(directory, name))
+    
+    def add_error(self, path: str, error: str):
+        """Record a directory the footprint scan could not measure"""
+        located = self._locate(path)
+        if located is not None:
+            self._totals[located[0]]['errors'].append((path, error))
+    
+    def reports(self) -> List[Dict]:
+        """Totals and largest subtrees and files of every root"""
+        reports = []
+        for root_key, root in self._order:
+            totals = self._totals[root_key]
+            subtrees = heapq.nlargest(self.top, totals['subtrees'].items(), key=lambda item: item[1])
+            reports.append({
+                'root': root,
+                'bytes': totals['bytes'],
+                'files': totals['files'],
+                'subtrees': subtrees,
+                'largest_files': sorted(((path, size) for size, path in totals['largest_files']),
+                                        key=lambda item: -item[1]),
+                'errors': totals['errors']
+            })
+        return reports
+
+
+def find_obsolete_extensions(ext_path: Path) -> List[Tuple[Path, str]]:
+    """Extension folders that VSCode no longer uses, as (folder, reason)
+    
+    Folders listed in extensions.json are never returned.
+    """
+    installed = None
+    try:
+        with open(ext_path / "extensions.json", 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        installed = set()
+        for item in entries if isinstance(entries, list) else []:
+            try:
+                installed.add((item.get('relativeLocation') or Path(item['location']['path']).name).lower())
+            except (KeyError, TypeError, AttributeError):
+                continue
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        with open(ext_path / ".obsolete", 'r', encoding='utf-8') as f:
+            marked = {name.lower() for name, flag in json.load(f).items() if flag}
+    except (OSError, ValueError, AttributeError):
+        marked = set()
+    
+    versions = {}
+    try:
+        with os.scandir(ext_path) as entries:
+            for entry in entries:
+                match = EXTENSION_FOLDER_PATTERN.match(entry.name)
+                if entry.is_dir(follow_symlinks=False) and match:
+                    version = tuple(int(part) for part in match.group('version').split('.'))
+                    versions.setdefault(match.group('id').lower(), []).append((version, entry.name))
+    except OSError:
+        return []
+    
+    obsolete = []
+    for folders in versions.values():
+        if installed is not None:
+            active = {name for _, name in folders if name.lower() in installed}
+        else:
+            # Platform variants of the newest version (-win32-x64, -universal) are all kept
+            newest = max(version for version, _ in folders)
+            active = {name for version, name in folders if version == newest}
+        for _, name in folders:
+            if installed is not None and name.lower() in installed:
+                continue
+            if name.lower() in marked:
+                obsolete.append((ext_path / name, "marked obsolete"))
+            elif active and name not in active:
+                obsolete.append((ext_path / name, f"superseded by {sorted(active)[-1]}"))
+    return obsolete
+
+
+class ParallelTreeCopier:
+    """Copy directory trees with a bounded pool of worker threads"""
+    
+    def __init__(self, workers: int = DEFAULT_COPY_WORKERS, max_pending: Optional[int] = None,
+                 rules: Optional[PathRules] = None):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 4
+        self.rules = rules
+    
+    def process_tree(self, source: Path, file_handler: Callable[[Path, str, os.DirEntry], Optional[int]],
+                     directory_handler: Optional[Callable[[str], None]] = None) -> Dict:
+        """Run file_handler(path, relative, entry) for every file below source on the worker pool
+        
+        directory_handler(relative) runs on the calling thread before any file in that directory.
+        """
+        source = Path(source)
+        stats = {'files': 0, 'reused': 0, 'bytes': 0, 'directories': 0, 'errors': []}
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.max_pending)
+        started = time.perf_counter()
+        
+        def run(file_path: Path, relative: str, entry: os.DirEntry):
+            try:
+                written = file_handler(file_path, relative, entry)
+                with lock:
+                    stats['files'] += 1
+                    if written is None:
+                        stats['reused'] += 1
+                    else:
+                        stats['bytes'] += written
+            except Exception as e:
+                with lock:
+                    stats['errors'].append((str(file_path), str(e)))
+            finally:
+                slots.release()
+        
+        walk_errors = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for entry, relative in scan_tree(source, self.rules, walk_errors):
+                if entry.is_dir(follow_symlinks=False):
+                    if directory_handler is not None:
+                        directory_handler(relative)
+                    stats['directories'] += 1
+                else:
+                    slots.acquire()
+                    pool.submit(run, Path(entry.path), relative, entry)
+        stats['errors'].extend(walk_errors)
+        
+        stats['elapsed'] = time.perf_counter() - started
+        elapsed = max(stats['elapsed'], 1e-6)
+        stats['files_per_sec'] = stats['files'] / elapsed
+        stats['bytes_per_sec'] = stats['bytes'] / elapsed
+        return stats
+
+
+class ArchiveMemberReader(io.RawIOBase):
+    """Read one member of a zip archive straight from its recorded offset, without the central directory"""
+    
+    LOCAL_HEADER = struct.Struct('<4s22xHH')
+    
+    def __init__(self, archive_path: Path, offset: int, compressed_size: int, method: int):
+        super().__init__()
+        self._file = open(archive_path, 'rb')
+        try:
+            self._file.seek(offset)
+            signature, name_length, extra_length = self.LOCAL_HEADER.unpack(self._file.read(self.LOCAL_HEADER.size))
+            if signature != b'PK\x03\x04':
+                raise zipfile.BadZipFile(f"no archive member at offset {offset}")
+            self._file.seek(name_length + extra_length, os.SEEK_CUR)
+        except (struct.error, zipfile.BadZipFile):
+            self._file.close()
+            raise zipfile.BadZipFile(f"no archive member at offset {offset}")
+        
+        if method == zipfile.ZIP_DEFLATED:
+            self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        elif method == zipfile.ZIP_STORED:
+            self._inflater = None
+        else:
+            self._file.close()
+            raise zipfile.BadZipFile(f"unsupported compression method {method}")
+        self._remaining = compressed_size
+        self._pending = b''
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while self._position >= len(self._pending):
+            if not self._remaining:
+                if self._inflater is None:
+                    return 0
+                self._pending, self._inflater = self._inflater.flush(), None
+            else:
+                chunk = self._file.read(min(COPY_CHUNK_SIZE, self._remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile("archive member is truncated")
+                self._remaining -= len(chunk)
+                self._pending = self._inflater.decompress(chunk) if self._inflater else chunk
+            self._position = 0
+        
+        count = min(len(buffer), len(self._pending) - self._position)
+        buffer[:count] = self._pending[self._position:self._position + count]
+        self._position += count
+        return count
+    
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class ParallelTreeDeleter:
+    """Delete directory trees with a bounded pool of worker threads
+    
+    Directories holding files that cannot be deleted are left in place and reported.
+    """
+    
+    def __init__(self, workers: int = DEFAULT_COPY_WORKERS, max_pending: Optional[int] = None,
+                 initializer: Optional[Callable[[], None]] = None):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 4
+        self.initializer = initializer
+    
+    @staticmethod
+    def _remove(path: str, is_directory_link: bool):
+        """Remove a file or a directory link, clearing the read-only attribute if needed"""
+        remove = os.rmdir if is_directory_link else os.unlink
+        try:
+            remove(path)
+        except PermissionError:
+            os.chmod(path, 0o600)
+            remove(path)
+    
+    def delete(self, root: Path) -> Dict:
+        """Delete root and everything below it, returning counts and failures"""
+        stats = {'files': 0, 'bytes': 0, 'directories': 0, 'errors': []}
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.max_pending)
+        blocked = set()
+        levels = []
+        started = time.perf_counter()
+        
+        def fail(path: str, error: OSError):
+            with lock:
+                stats['errors'].append((path, str(error)))
+                blocked.add(os.path.dirname(path))
+        
+        def remove_entry(path: str, size: int, is_directory_link: bool):
+            try:
+                self._remove(path, is_directory_link)
+                with lock:
+                    stats['files'] += 1
+                    stats['bytes'] += size
+            except OSError as e:
+                fail(path, e)
+            finally:
+                slots.release()
+        
+        root = str(root)
+        try:
+            root_stat = os.stat(root, follow_symlinks=False)
+            is_link = os.path.islink(root) or bool(
+                getattr(root_stat, 'st_file_attributes', 0) & FILE_ATTRIBUTE_REPARSE_POINT)
+            if is_link or not os.path.isdir(root):
+                # A file or a linked root: remove it, never what a link points to
+                self._remove(root, is_link and os.name == 'nt' and os.path.isdir(root))
+                stats['files'] += 1
+                stats['bytes'] += 0 if is_link else root_stat.st_size
+                stats['elapsed'] = time.perf_counter() - started
+                return stats
+        except OSError as e:
+            stats['errors'].append((root, str(e)))
+            stats['elapsed'] = time.perf_counter() - started
+            return stats
+        
+        with ThreadPoolExecutor(max_workers=self.workers, initializer=self.initializer) as pool:
+            pending = [(root, 0)]
+            while pending:
+                directory, depth = pending.pop()
+                if len(levels) <= depth:
+                    levels.append([])
+                levels[depth].append(directory)
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            try:
+                                entry_stat = entry.stat(follow_symlinks=False)
+                                is_link = bool(getattr(entry_stat, 'st_file_attributes', 0) & FILE_ATTRIBUTE_REPARSE_POINT)
+                                if entry.is_dir(follow_symlinks=False) and not is_link:
+                                    pending.append((entry.path, depth + 1))
+                                    continue
+                                # Only Windows needs rmdir for directory links
+                                is_directory_link = is_link and entry.is_dir()
+                            except OSError as e:
+                                fail(entry.path, e)
+                                continue
+                            slots.acquire()
+                            pool.submit(remove_entry, entry.path, 0 if is_directory_link else entry_stat.st_size,
+                                        is_directory_link)
+                except OSError as e:
+                    fail(directory, e)
+        
+        def remove_directory(directory: str):
+            if directory in blocked:
+                with lock:
+                    blocked.add(os.path.dirname(directory))
+                return
+            try:
+                os.rmdir(directory)
+                with lock:
+                    stats['directories'] += 1
+            except OSError as e:
+                fail(directory, e)
+        
+        with ThreadPoolExecutor(max_workers=self.workers, initializer=self.initializer) as pool:
+            for level in reversed(levels):
+                list(pool.map(remove_directory, level))
+        
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+
+
+def lower_thread_priority():
+    """Lower the calling thread's scheduling priority so it yields to interactive work"""
+    try:
+        if os.name == 'nt':
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_LOWEST)
+        elif sys.platform.startswith('linux') and hasattr(threading, 'get_native_id'):
+            # Linux applies a PRIO_PROCESS priority to the single thread it is given
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PURGE_NICENESS)
+    except (OSError, AttributeError):
+        pass
+
+
+class TombstonePurger:
+    """Rename folders to tombstones at once and delete them on a low-priority background thread
+    
+    The journal lets resume() pick up tombstones an interrupted run left behind.
+    """
+    
+    def __init__(self, journal_path: Path, workers: int = PURGE_WORKERS,
+                 log: Optional[Callable[[str, str], None]] = None):
+        self.journal_path = Path(journal_path)
+        self.workers = workers
+        self.log = log or (lambda message, level="INFO": None)
+        self.progress = {'pending': 0, 'purged': 0, 'files': 0, 'bytes': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._thread = None
+        self._journal = self._load_journal()
+    
+    def _load_journal(self) -> Dict[str, Dict]:
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_journal(self):
+        """Persist the journal atomically, removing it once empty; callers hold the lock"""
+        partial = self.journal_path.with_suffix('.tmp')
+        try:
+            if not self._journal:
+                if self.journal_path.exists():
+                    self.journal_path.unlink()
+                return
+            with open(partial, 'w', encoding='utf-8') as f:
+                json.dump(self._journal, f, indent=2)
+            os.replace(partial, self.journal_path)
+        except OSError as e:
+            self.log(f"Could not save tombstone journal: {e}", "WARNING")
+    
+    def bury(self, path: Path) -> Optional[Path]:
+        """Rename path to a tombstone and queue it for purging, or return None if it cannot be moved"""
+        path = Path(path)
+        tombstone = path.parent / f"{TOMBSTONE_PREFIX}{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._journal[str(tombstone)] = {'original': str(path), 'buried_at': time.time()}
+            self._save_journal()
+        try:
+            os.rename(path, tombstone)
+        except OSError:
+            # Usually a file inside is still open; the caller deletes in place instead
+            with self._lock:
+                del self._journal[str(tombstone)]
+                self._save_journal()
+            return None
+        self._enqueue([tombstone])
+        return tombstone
+    
+    def resume(self) -> int:
+        """Queue tombstones an earlier run left behind, returning how many were found"""
+        with self._lock:
+            queued = {str(tombstone) for tombstone in self._pending}
+            leftovers = [Path(path) for path in self._journal if path not in queued]
+            for tombstone in leftovers:
+                # Only folders bury() renamed are ever deleted, whatever the journal says
+                if not tombstone.name.startswith(TOMBSTONE_PREFIX):
+                    self.log(f"Purge: ignoring {tombstone} in the journal, it is not a tombstone", "WARNING")
+                    del self._journal[str(tombstone)]
+                elif not os.path.lexists(tombstone):
+                    del self._journal[str(tombstone)]
+            self._save_journal()
+        leftovers = [tombstone for tombstone in leftovers
+                     if tombstone.name.startswith(TOMBSTONE_PREFIX) and os.path.lexists(tombstone)]
+        if leftovers:
+            self.log(f"🧹 Purge: resuming {len(leftovers)} tombstones from an earlier run", "INFO")
+            self._enqueue(leftovers)
+        return len(leftovers)
+    
+    def _enqueue(self, tombstones: List[Path]):
+        with self._lock:
+            self._pending.extend(tombstones)
+            self.progress['pending'] += len(tombstones)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._purge, name="TombstonePurger", daemon=True)
+                self._thread.start()
+    
+    def _purge(self):
+        """Delete queued tombstones one at a time until the queue is empty"""
+        lower_thread_priority()
+        deleter = ParallelTreeDeleter(self.workers, initializer=lower_thread_priority)
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                tombstone = self._pending.popleft()
+                original = self._journal.get(str(tombstone), {}).get('original', str(tombstone))
+            
+            stats = deleter.delete(tombstone)
+            with self._lock:
+                self.progress['pending'] -= 1
+                self.progress['files'] += stats['files']
+                self.progress['bytes'] += stats['bytes']
+                if not stats['errors'] or not os.path.lexists(tombstone):
+                    self.progress['purged'] += 1
+                    self._journal.pop(str(tombstone), None)
+                    self._save_journal()
+                else:
+                    # Left in the journal so the next run tries again
+                    self.progress['errors'] += len(stats['errors'])
+                pending = self.progress['pending']
+            if stats['errors'] and os.path.lexists(tombstone):
+                self.log(f"🧹 Purge: {len(stats['errors'])} entries of {original} could not be deleted "
+                         f"and stay in {tombstone}", "WARNING")
+            else:
+                self.log(f"🧹 Purge: {original} purged ({stats['files']} files, "
+                         f"{stats['bytes'] / (1024 * 1024):.1f} MB), {pending} remaining", "INFO")
+    
+    def status(self) -> Dict:
+        """Snapshot of the purge progress"""
+        with self._lock:
+            return dict(self.progress, running=self._thread is not None)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued tombstones to be purged, returning False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return True
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                return False
+
+
+class BackupReader:
+    """Read files back out of a backup folder, the object store or an archive
+    
+    Backups without a file manifest are scanned instead.
+    """
+    
+    def __init__(self, backup_dir: Path):
+        self.backup_dir = Path(backup_dir)
+        manifest_path = self.backup_dir / "file_manifest.json"
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = self._scan_folder()
+        self.files = self.manifest['files']
+        self.algorithm = self.manifest.get('algorithm', HASH_ALGORITHM)
+        self.store = ContentStore(Path(self.manifest['store'])) if self.manifest.get('store') else None
+        archive_name = self.manifest.get('archive')
+        self.archive_path = self.backup_dir / archive_name if archive_name else None
+        self._archive = None
+        self._archive_lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self._archive:
+            self._archive.close()
+            self._archive = None
+    
+    def _zip(self) -> zipfile.ZipFile:
+        """Open the archive's central directory for generated files outside the member index"""
+        with self._archive_lock:
+            if self._archive is None:
+                self._archive = zipfile.ZipFile(self.archive_path)
+            return self._archive
+    
+    def _scan_folder(self) -> Dict:
+        """Build a manifest for a backup folder that has none"""
+        files = {}
+        for top in ("Settings", "Extensions", "MachineID"):
+            for entry, relative in scan_tree(self.backup_dir / top):
+                if not entry.is_dir(follow_symlinks=False):
+                    stat = entry.stat()
+                    files[f"{top}/{relative}"] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        return {'mode': 'legacy', 'files': files}
+    
+    def open(self, relative: str):
+        """Open a backed-up file for reading"""
+        entry = self.files[relative]
+        if entry.get('stored'):
+            return open(self.store.object_path(entry[self.algorithm]), 'rb')
+        if entry.get('archived'):
+            if 'offset' not in entry:
+                raise zipfile.BadZipFile(f"no offset recorded for archive member {relative}")
+            return ArchiveMemberReader(self.archive_path, entry['offset'], entry['compressed_size'], entry['method'])
+        return open(self.backup_dir / relative, 'rb')
+    
+    def select(self, pattern: str) -> List[str]:
+        """Files matching a backup path, a folder inside the backup or a glob on path or name"""
+        pattern = pattern.replace('\\', '/').strip('/')
+        if pattern in self.files:
+            return [pattern]
+        prefix = pattern + '/'
+        return sorted(
+            relative for relative in self.files
+            if relative.startswith(prefix)
+            or fnmatch.fnmatch(relative, pattern)
+            or fnmatch.fnmatch(relative.rsplit('/', 1)[-1], pattern)
+        )
+    
+    def read_extra(self, relative: str) -> Optional[bytes]:
+        """Read a generated file (registry snapshot, lists) that is not in the manifest"""
+        if self.archive_path:
+            try:
+                return self._zip().read(relative)
+            except KeyError:
+                return None
+        path = self.backup_dir / relative
+        return path.read_bytes() if path.exists() else None
+
+
+class BackupVerifier:
+    """Check a backup folder against its per-file manifest, hashing on a thread pool"""
+    
+    def __init__(self, backup_dir: Path, workers: int = DEFAULT_VERIFY_WORKERS):
+        self.reader = BackupReader(backup_dir)
+        self.workers = max(1, workers)
+    
+    def verify(self, sample: Optional[float] = None, fail_fast: bool = True) -> Dict:
+        """Verify all files, or a random fraction of them when sample is given"""
+        entries = list(self.reader.files.items())
+        if sample is not None and entries:
+            count = min(len(entries), max(VERIFY_MIN_SAMPLE, int(len(entries) * sample)))
+            entries = random.sample(entries, count)
+        
+        result = {
+            'backup': str(self.reader.backup_dir),
+            'mode': 'sample' if sample is not None else 'full',
+            'total_files': len(self.reader.files),
+            'checked': 0,
+            'bytes': 0,
+            'failures': []
+        }
+        stop = threading.Event()
+        started = time.perf_counter()
+        
+        with self.reader, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._check_entry, relative, entry, stop) for relative, entry in entries]
+            for future in as_completed(futures):
+                checked, size, error = future.result()
+                if checked:
+                    result['checked'] += 1
+                    result['bytes'] += size
+                if error:
+                    result['failures'].append(error)
+                    if fail_fast:
+                        # Queued checks see the event and return without reading
+                        stop.set()
+        
+        result['elapsed'] = time.perf_counter() - started
+        result['ok'] = not result['failures']
+        return result
+    
+    def _check_entry(self, relative: str, entry: Dict, stop: threading.Event) -> Tuple[bool, int, Optional[Tuple[str, str]]]:
+        """Check one manifest entry, returning (checked, size, failure)"""
+        if stop.is_set():
+            return False, 0, None
+        
+        algorithm = self.reader.algorithm
+        expected = entry.get(algorithm)
+        digest = hashlib.new(algorithm)
+        size = 0
+        try:
+            with self.reader.open(relative) as f:
+                if expected is None:
+                    # Linked snapshot files carry no digest; size is all we can check
+                    size = os.fstat(f.fileno()).st_size
+                else:
+                    while True:
+                        chunk = f.read(COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        size += len(chunk)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            return True, 0, (relative, f"unreadable: {e}")
+        
+        if size != entry['size']:
+            return True, size, (relative, f"size {size} != {entry['size']}")
+        if expected is not None and digest.hexdigest() != expected:
+            return True, size, (relative, f"{algorithm} mismatch")
+        return True, size, None
+
+
+class RestoreEngine:
+    """Copy backed-up files back in parallel, resuming from a checkpoint journal
+    
+    In delta mode, files already identical on disk are left alone.
+    """
+    
+    def __init__(self, reader: BackupReader, destination_for: Callable[[str], Optional[Path]],
+                 journal_path: Path, workers: int = DEFAULT_COPY_WORKERS, delta: bool = True,
+                 only: Optional[Iterable[str]] = None):
+        self.reader = reader
+        self.destination_for = destination_for
+        self.journal_path = Path(journal_path)
+        self.workers = max(1, workers)
+        self.delta = delta
+        self.only = sorted(only) if only is not None else None
+    
+    def _load_journal(self) -> set:
+        """Files restored by an earlier, interrupted run"""
+        done = set()
+        if not self.journal_path.exists():
+            return done
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line))
+                except ValueError:
+                    # A torn last line from a crash is simply redone
+                    continue
+        return done
+    
+    def run(self) -> Dict:
+        """Restore every selected file that has a destination, and the recorded directories"""
+        stats = {'files': 0, 'bytes': 0, 'directories': 0, 'resumed': 0, 'skipped': 0, 'skipped_bytes': 0,
+                 'errors': []}
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.workers * 4)
+        started = time.perf_counter()
+        done = self._load_journal()
+        
+        # Settings and MachineID both hold globalStorage; restore each destination once
+        plan = {}
+        for relative in self.only if self.only is not None else sorted(self.reader.files):
+            destination = self.destination_for(relative)
+            if destination is not None:
+                plan[destination] = relative
+        
+        def restore(destination: Path, relative: str, journal):
+            try:
+                if self.delta and self._is_identical(relative, destination):
+                    with lock:
+                        stats['skipped'] += 1
+                        stats['skipped_bytes'] += self.reader.files[relative]['size']
+                    return
+                size = self._restore_file(relative, destination)
+                with lock:
+                    journal.write(json.dumps(relative) + "\n")
+                    journal.flush()
+                    stats['files'] += 1
+                    stats['bytes'] += size
+            except Exception as e:
+                with lock:
+                    stats['errors'].append((relative, str(e)))
+            finally:
+                slots.release()
+        
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.reader, open(self.journal_path, 'a', encoding='utf-8') as journal:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for destination, relative in plan.items():
+                    if relative in done:
+                        stats['resumed'] += 1
+                        continue
+                    slots.acquire()
+                    pool.submit(restore, destination, relative, journal)
+        
+        # Empty folders have no files to bring them back
+        if self.only is None:
+            for relative in self.reader.manifest.get('directories', []):
+                destination = self.destination_for(relative)
+                if destination is None or destination.is_dir():
+                    continue
+                try:
+                    destination.mkdir(parents=True, exist_ok=True)
+                    stats['directories'] += 1
+                except OSError as e:
+                    stats['errors'].append((relative, str(e)))
+        
+        if not stats['errors']:
+            self.journal_path.unlink()
+        
+        stats['elapsed'] = time.perf_counter() - started
+        return stats
+    
+    def _is_identical(self, relative: str, destination: Path) -> bool:
+        """Check whether the live file already matches the backed-up one"""
+        entry = self.reader.files[relative]
+        try:
+            stat = destination.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry.get('mtime'):
+            return True
+        
+        # Same size but touched since: only a matching digest proves it unchanged
+        expected = entry.get(self.reader.algorithm)
+        if expected is None:
+            return False
+        try:
+            return _hash_file(destination, self.reader.algorithm) == expected
+        except OSError:
+            return False
+    
+    def _restore_file(self, relative: str, destination: Path) -> int:
+        """Copy one file into place atomically and restore its mtime"""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        partial = destination.with_name(destination.name + ".vscode-restore")
+        size = 0
+        with self.reader.open(relative) as fsrc, open(partial, 'wb') as fdst:
+            while True:
+                chunk = fsrc.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                fdst.write(chunk)
+                size += len(chunk)
+        os.replace(partial, destination)
+        
+        mtime = self.reader.files[relative].get('mtime')
+        if mtime is not None:
+            os.utime(destination, ns=(mtime, mtime))
+        return size
+
+
+class BackupCatalog:
+    """SQLite index of backups, so listing them never touches the backup folders"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS backups (
+            session_id TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            created TEXT NOT NULL,
+            mode TEXT,
+            total_bytes INTEGER,
+            file_count INTEGER,
+            source_paths TEXT,
+            verification TEXT NOT NULL DEFAULT 'unverified',
+            verified_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_backups_created ON backups (created);
+        CREATE INDEX IF NOT EXISTS idx_backups_path ON backups (path);
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(self.SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; callers close it and use it as a transaction"""
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def record_backup(self, session_id: str, path: Path, created: str, mode: Optional[str],
+                      total_bytes: Optional[int], file_count: Optional[int], source_paths: List[str]):
+        """Add or replace a backup entry"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO backups "
+                "(session_id, path, created, mode, total_bytes, file_count, source_paths) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, str(path), created, mode, total_bytes, file_count, json.dumps(source_paths))
+            )
+    
+    def set_verification(self, path: Path, state: str):
+        """Record the outcome of a verification run"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE backups SET verification = ?, verified_at = ? WHERE path = ?",
+                (state, datetime.now().isoformat(), str(path))
+            )
+    
+    def list_backups(self, limit: Optional[int] = None, newest_first: bool = False) -> List[Dict]:
+        """Catalog entries ordered by creation time"""
+        query = f"SELECT * FROM backups ORDER BY created {'DESC' if newest_first else 'ASC'}"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(row, source_paths=json.loads(row['source_paths'] or '[]')) for row in rows]
+    
+    def latest(self, exclude: Optional[Path] = None) -> Optional[Dict]:
+        """Newest backup with a per-file manifest"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT * FROM backups WHERE file_count IS NOT NULL AND path != ? "
+                "ORDER BY created DESC LIMIT 1",
+                (str(exclude) if exclude else '',)
+            ).fetchone()
+        return dict(row, source_paths=json.loads(row['source_paths'] or '[]')) if row else None
+    
+    def remove(self, path: Path):
+        """Drop an entry whose folder no longer exists"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM backups WHERE path = ?", (str(path),))
+    
+    def is_empty(self) -> bool:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("SELECT 1 FROM backups LIMIT 1").fetchone() is None
+    
+    def import_folders(self, backup_dirs: Iterable[Path]) -> int:
+        """Index backups made before the catalog existed, reading each manifest once"""
+        imported = 0
+        for backup_dir in backup_dirs:
+            try:
+                with open(backup_dir / "backup_manifest.json", 'r') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                # Folders without a manifest never finished a backup
+                continue
+            
+            files = None
+            try:
+                with open(backup_dir / "file_manifest.json", 'r') as f:
+                    files = json.load(f)['files']
+            except (OSError, ValueError, KeyError):
+                pass
+            
+            info = manifest.get('backup_info', {})
+            self.record_backup(
+                info.get('session_id', backup_dir.name.replace("VSCode_Backup_", "")),
+                backup_dir,
+                info.get('created', datetime.fromtimestamp(backup_dir.stat().st_mtime).isoformat()),
+                info.get('backup_mode'),
+                sum(e['size'] for e in files.values()) if files is not None else None,
+                len(files) if files is not None else None,
+                manifest.get('vscode_info', {}).get('user_data_paths', [])
+            )
+            imported += 1
+        return imported
+
+
+class WinregBackend:
+    """Registry backend reading the live Windows registry through winreg"""
+    
+    def read_key(self, hive: str, path: str) -> Tuple[List[Tuple[str, object, int]], List[str]]:
+        """Return ([(name, data, type)], [subkey names]) for a key"""
+        with winreg.OpenKey(getattr(winreg, hive), path) as key:
+            subkey_count, value_count, _ = winreg.QueryInfoKey(key)
+            subkeys = [winreg.EnumKey(key, i) for i in range(subkey_count)]
+            values = [winreg.EnumValue(key, i) for i in range(value_count)]
+        return values, subkeys
+    
+    def write_key(self, hive: str, path: str, values: List[Tuple[str, object, int]]):
+        """Create a key if needed and set its values"""
+        with winreg.CreateKeyEx(getattr(winreg, hive), path, 0, winreg.KEY_WRITE) as key:
+            for name, data, value_type in values:
+                winreg.SetValueEx(key, name, 0, value_type, data)
+
+
+class SnapshotRegistryBackend:
+    """Registry backend serving keys from a JSON snapshot held in memory"""
+    
+    def __init__(self, snapshot: Dict[str, Dict]):
+        self._keys = {name.lower(): data for name, data in snapshot.items()}
+    
+    def read_key(self, hive: str, path: str) -> Tuple[List[Tuple[str, object, int]], List[str]]:
+        """Return ([(name, data, type)], [subkey names]) for a key"""
+        data = self._keys.get(f"{hive}\\{path}".lower())
+        if data is None:
+            raise FileNotFoundError(f"{hive}\\{path}")
+        values = [(v['name'], _decode_reg_data(v['data']), v['type']) for v in data['values']]
+        return values, list(data['subkeys'])
+    
+    def write_key(self, hive: str, path: str, values: List[Tuple[str, object, int]]):
+        """Create a key if needed and set its values"""
+        data = self._keys.setdefault(f"{hive}\\{path}".lower(), {'values': [], 'subkeys': []})
+        written = {name for name, _, _ in values}
+        data['values'] = [v for v in data['values'] if v['name'] not in written] + [
+            {'name': name, 'type': value_type, 'data': _encode_reg_data(value)}
+            for name, value, value_type in values
+        ]
+        
+        parent, _, child = path.rpartition('\\')
+        parent_data = self._keys.get(f"{hive}\\{parent}".lower()) if parent else None
+        if parent_data is not None and child not in parent_data['subkeys']:
+            parent_data['subkeys'].append(child)
+
+
+def _encode_reg_data(data):
+    """Make registry value data JSON serialisable"""
+    if isinstance(data, (bytes, bytearray)):
+        return {'hex': bytes(data).hex()}
+    return data
+
+
+def _decode_reg_data(data):
+    """Reverse _encode_reg_data"""
+    if isinstance(data, dict) and 'hex' in data:
+        return bytes.fromhex(data['hex'])
+    return data
+
+
+class RegistryExporter:
+    """Export registry trees in one in-process pass, as a snapshot that renders to a .reg file"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.unreadable = []
+    
+    def export_key(self, hive: str, path: str) -> Dict[str, Dict]:
+        """Snapshot a key and everything below it, listing keys that cannot be read in ``unreadable``"""
+        snapshot = {}
+        pending = [path]
+        while pending:
+            key_path = pending.pop()
+            try:
+                values, subkeys = self.backend.read_key(hive, key_path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self.unreadable.append((f"{hive}\\{key_path}", str(e)))
+                continue
+            snapshot[f"{hive}\\{key_path}"] = {
+                'values': [
+                    {'name': name, 'type': value_type, 'data': _encode_reg_data(data)}
+                    for name, data, value_type in values
+                ],
+                'subkeys': subkeys
+            }
+            # Reversed so keys come out in regedit's depth-first order
+            pending.extend(f"{key_path}\\{subkey}" for subkey in reversed(subkeys))
+        return snapshot
+    
+    @staticmethod
+    def to_reg(snapshot: Dict[str, Dict]) -> str:
+        """Render a snapshot in regedit's .reg format"""
+        lines = ["Windows Registry Editor Version 5.00", ""]
+        for key_name, data in snapshot.items():
+            lines.append(f"[{key_name}]")
+            for value in data['values']:
+                name = '@' if value['name'] == '' else f'"{RegistryExporter._escape(value["name"])}"'
+                rendered = RegistryExporter._format_value(value['type'], _decode_reg_data(value['data']))
+                lines.append(f"{name}={rendered}")
+            lines.append("")
+        return "\r\n".join(lines) + "\r\n"
+    
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace('\\', '\\\\').replace('"', '\\"')
+    
+    @staticmethod
+    def _format_value(value_type: int, data) -> str:
+        """Format value data the way reg export does"""
+        if value_type == REG_SZ and isinstance(data, str):
+            return f'"{RegistryExporter._escape(data)}"'
+        if value_type == REG_DWORD and isinstance(data, int):
+            return f"dword:{data & 0xFFFFFFFF:08x}"
+        
+        if value_type == REG_QWORD and isinstance(data, int):
+            raw = data.to_bytes(8, 'little', signed=data < 0)
+        elif value_type == REG_EXPAND_SZ and isinstance(data, str):
+            raw = (data + '\0').encode('utf-16-le')
+        elif value_type == REG_MULTI_SZ and isinstance(data, list):
+            raw = ''.join(item + '\0' for item in data).encode('utf-16-le') + b'\0\0'
+        elif data is None:
+            raw = b''
+        elif isinstance(data, str):
+            raw = (data + '\0').encode('utf-16-le')
+        else:
+            raw = bytes(data)
+        
+        prefix = "hex" if value_type == REG_BINARY else f"hex({value_type:x})"
+        return f"{prefix}:{','.join(f'{b:02x}' for b in raw)}"
+
+
+TELEMETRY_RULES = PathRules(TELEMETRY_PATTERNS)
+
+
+def temp_signature_rules(products: Iterable[str]) -> PathRules:
+    """Rules matching the Temp entries of the given products, matched per entry"""
+    return PathRules(SHARED_TEMP_PATTERNS + [
+        pattern for product in products for pattern in PRODUCT_PROFILES[product]['temp_patterns']
+    ])
+
+
+def match_product_paths(products: Iterable[str], environment: Dict[str, str]) -> List[Tuple[str, str, Path]]:
+    """Find the folders of several products in one pass, returning (product, kind, path)
+    
+    Kinds are 'install', 'data', 'cache' and 'portable'.
+    """
+    wanted = {}
+    candidates = [(product, kind, folder) for product in products
+                  for kind, key in (('install', 'install_dirs'), ('data', 'data_dirs'), ('cache', 'cache_dirs'))
+                  for folder in PRODUCT_PROFILES[product][key]]
+    for product, kind, (variable, relative) in candidates:
+        base = environment.get(variable)
+        if not base:
+            continue
+        *parents, name = relative.split('\\')
+        parent = os.path.join(base, *parents)
+        wanted.setdefault(parent, {}).setdefault(name.lower(), []).append((product, kind))
+    
+    found = []
+    for parent, names in wanted.items():
+        try:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    for product, kind in names.get(entry.name.lower(), ()):
+                        if entry.is_dir():
+                            found.append((product, kind, Path(entry.path)))
+        except OSError:
+            # Missing parents simply hold no products
+            continue
+    
+    for product, kind, path in list(found):
+        if kind == 'install' and (path / PORTABLE_DATA_DIR).is_dir():
+            found.append((product, 'portable', path / PORTABLE_DATA_DIR))
+    return found
+
+
+class PathDiscovery(Mapping):
+    """Lazily discovered VSCode paths for one user, looked up and cached per category
+    
+    Operations that delete or recreate VSCode data call invalidate().
+    """
+    
+    CATEGORIES = (
+        'product_matches', 'install_paths', 'user_data_paths',
+        'extension_paths', 'cache_paths', 'workspace_storage_paths', 'temp_entries'
+    )
+    
+    def __init__(self, products: Iterable[str], environment: Dict[str, str]):
+        self.products = list(products)
+        self.environment = environment
+        self._cache = {}
+        self._lock = threading.RLock()
+    
+    def __getitem__(self, category: str) -> List[Path]:
+        if category not in self.CATEGORIES:
+            raise KeyError(category)
+        with self._lock:
+            if category not in self._cache:
+                self._cache[category] = getattr(self, f"_discover_{category}")()
+            return list(self._cache[category])
+    
+    def __iter__(self):
+        return iter(self.CATEGORIES)
+    
+    def __len__(self) -> int:
+        return len(self.CATEGORIES)
+    
+    def invalidate(self, *categories: str):
+        """Forget the given categories, or all of them"""
+        with self._lock:
+            for category in categories or list(self._cache):
+                self._cache.pop(category, None)
+    
+    def product_of(self, path: Path) -> Optional[str]:
+        """The product a discovered folder (or a path inside one) belongs to"""
+        path = Path(path)
+        for product, _, root in self['product_matches']:
+            if product and (path == root or root in path.parents):
+                return product
+        return None
+    
+    def footprint_roots(self) -> Dict[str, List[Path]]:
+        """Directories measured by system analysis, grouped by footprint category"""
+        roots = {
+            'installs': self['install_paths'],
+            'user_data': self['user_data_paths'],
+            'extensions': self['extension_paths'],
+            'caches': self['cache_paths'],
+            'workspace_storage': self['workspace_storage_paths']
+        }
+        for user_path in self['user_data_paths']:
+            roots['caches'].extend(p for p in (user_path / name for name in USER_DATA_CACHE_DIRS) if p.is_dir())
+        roots['caches'].extend(self['temp_entries'])
+        return roots
+    
+    def removal_targets(self, mode: str) -> List[Path]:
+        """Directories removed in the given removal mode"""
+        directories = []
+        
+        if mode in ["basic", "complete", "ultimate"]:
+            directories.extend(self['install_paths'])
+            directories.extend(self['user_data_paths'])
+        
+        if mode in ["complete", "ultimate"]:
+            directories.extend(self['extension_paths'])
+            directories.extend(self['cache_paths'])
+        
+        if mode == "ultimate":
+            # Add additional cleanup paths
+            # Temp is never removed wholesale: its VS Code entries go through temp_signature_rules
+            additional_paths = [("LOCALAPPDATA", os.path.join("Microsoft", "VSCode"))]
+            directories.extend(
+                Path(self.environment[variable]) / relative
+                for variable, relative in additional_paths if self.environment.get(variable)
+            )
+        return directories
+    
+    def _product_paths(self, *kinds: str) -> List[Path]:
+        return [path for _, kind, path in self['product_matches'] if kind in kinds]
+    
+    def _discover_product_matches(self) -> List[Tuple[str, str, Path]]:
+        """Folders of the selected products, found in a single pass"""
+        return match_product_paths(self.products, self.environment)
+    
+    def _discover_install_paths(self) -> List[Path]:
+        """Installation paths"""
+        return self._product_paths('install')
+    
+    def _discover_user_data_paths(self) -> List[Path]:
+        """User data paths, including the user-data folder of portable installs"""
+        paths = self._product_paths('data')
+        paths += [p / "user-data" for p in self._product_paths('portable') if (p / "user-data").is_dir()]
+        return paths
+    
+    def _discover_extension_paths(self) -> List[Path]:
+        """Extension folders inside the user data paths and portable data folders"""
+        ext_paths = [user_path / "extensions" for user_path in self['user_data_paths']]
+        ext_paths += [p / "extensions" for p in self._product_paths('portable')]
+        return [p for p in ext_paths if p.exists()]
+    
+    def _discover_cache_paths(self) -> List[Path]:
+        """Cache paths"""
+        return self._product_paths('cache')
+    
+    def _discover_workspace_storage_paths(self) -> List[Path]:
+        """Per-workspace state folders inside the user data paths"""
+        storage_paths = (user_path / "User" / "workspaceStorage" for user_path in self['user_data_paths'])
+        return [p for p in storage_paths if p.is_dir()]
+    
+    def _discover_temp_entries(self) -> List[Path]:
+        """Files and folders in Temp matching the products' signatures, each Temp folder listed once"""
+        rules = temp_signature_rules(self.products)
+        folders = {}
+        for variable in ('TEMP', 'TMP'):
+            folder = self.environment.get(variable)
+            if folder:
+                folders.setdefault(os.path.normcase(os.path.realpath(folder)), folder)
+        
+        entries = []
+        for folder in folders.values():
+            try:
+                with os.scandir(folder) as listing:
+                    entries += [Path(entry.path) for entry in listing
+                                if rules.matches(entry.name, entry.name, entry.is_dir(follow_symlinks=False))]
+            except OSError:
+                # A missing Temp folder holds no entries
+                continue
+        return entries
+
+
+def user_profile_environment(home: Path) -> Dict[str, str]:
+    """Per-user environment folders of another user's profile"""
+    home = Path(home)
+    local_app_data = home / "AppData" / "Local"
+    return {
+        'USERPROFILE': str(home),
+        'APPDATA': str(home / "AppData" / "Roaming"),
+        'LOCALAPPDATA': str(local_app_data),
+        'TEMP': str(local_app_data / "Temp"),
+        'TMP': str(local_app_data / "Temp"),
+    }
+
+
+def list_user_profiles(users_root: Path) -> List[Path]:
+    """Home folders of real users below a users root such as C:\\Users"""
+    profiles = []
+    try:
+        with os.scandir(users_root) as entries:
+            for entry in entries:
+                if entry.name.lower() in SKIPPED_USER_PROFILES or not entry.is_dir(follow_symlinks=False):
+                    continue
+                if os.path.isdir(os.path.join(entry.path, "AppData")):
+                    profiles.append(Path(entry.path))
+    except OSError:
+        pass
+    return sorted(profiles)
+
+
 class VSCodeRemovalTool:
     """Main class for VSCode Ultimate Removal Tool"""
     
-    def __init__(self):
+    def __init__(self, backup_mode: str = "full", copy_workers: int = DEFAULT_COPY_WORKERS,
+                 lean_extensions: bool = False, backup_rules: Optional[PathRules] = None,
+                 registry_backend=None, products: Iterable[str] = DEFAULT_PRODUCTS,
+                 environment: Optional[Dict[str, str]] = None, background_purge: bool = True):
         self.version = "3.0"
         self.developer = "@aliseylabi"
         self.telegram = "@aliseylabi"
@@ -75,13 +1979,35 @@ class VSCodeRemovalTool:
         self.setup_logging()
         
         # VSCode related paths
+        self.products = list(products)
+        self.environment = dict(environment if environment is not None else os.environ)
         self.vscode_paths = self._get_vscode_paths()
         self.backup_created = False
+        self.backup_mode = backup_mode
+        self._file_manifest = {}
+        self._backup_directories = set()
+        self._manifest_lock = threading.Lock()
+        self.copy_workers = copy_workers
+        self.lean_extensions = lean_extensions
+        self.backup_rules = backup_rules if backup_rules is not None else PathRules(DEFAULT_BACKUP_EXCLUDES)
+        if registry_backend is None and WINREG_AVAILABLE:
+            registry_backend = WinregBackend()
+        self.registry_backend = registry_backend
+        self._content_store = None
+        self._previous_backup = None
+        self._archive = None
+        self._reflink_supported = REFLINK_AVAILABLE
+        self._snapshot_hardlinks = False
+        self.background_purge = background_purge
+        self._purger = None
+        self._purger_lock = threading.Lock()
+        self.profile_stats = {}
         self.removal_stats = {
             'processes_terminated': 0,
             'directories_removed': 0,
             'registry_keys_removed': 0,
             'files_deleted': 0,
+            'bytes_deleted': 0,
             'machine_id_reset': False
         }
         
@@ -310,6 +2236,10 @@ class VSCodeRemovalTool:
         """Setup working directories"""
         self.temp_dir = Path(tempfile.gettempdir()) / "VSCode_Removal_Logs"
         self.backup_dir = Path.home() / "Desktop" / f"VSCode_Backup_{self.session_id}"
+        self.store_dir = Path.home() / "Desktop" / "VSCode_Object_Store"
+        self.catalog_path = Path.home() / "Desktop" / "VSCode_Backups.db"
+        self.footprint_cache_path = Path(tempfile.gettempdir()) / "VSCode_Removal_Logs" / FOOTPRINT_CACHE_NAME
+        self.tombstone_journal_path = Path.home() / "Desktop" / TOMBSTONE_JOURNAL_NAME
         
         # Create directories
         self.temp_dir.mkdir(exist_ok=True)
@@ -350,56 +2280,9 @@ class VSCodeRemovalTool:
         self.logger.info(f"Developer: {self.developer}")
         self.logger.info(f"Session ID: {self.session_id}")
     
-    def _get_vscode_paths(self) -> Dict[str, List[Path]]:
-        """Get all possible VSCode installation and data paths"""
-        paths = {
-            'install_paths': [],
-            'user_data_paths': [],
-            'extension_paths': [],
-            'cache_paths': []
-        }
-        
-        # Installation paths
-        local_app_data = Path(os.environ.get('LOCALAPPDATA', ''))
-        program_files = Path(os.environ.get('PROGRAMFILES', ''))
-        program_files_x86 = Path(os.environ.get('PROGRAMFILES(X86)', ''))
-        
-        install_candidates = [
-            local_app_data / "Programs" / "Microsoft VS Code",
-            program_files / "Microsoft VS Code",
-            program_files_x86 / "Microsoft VS Code"
-        ]
-        
-        paths['install_paths'] = [p for p in install_candidates if p.exists()]
-        
-        # User data paths
-        app_data = Path(os.environ.get('APPDATA', ''))
-        user_profile = Path(os.environ.get('USERPROFILE', ''))
-        
-        user_data_candidates = [
-            app_data / "Code",
-            app_data / "Code - Insiders",
-            user_profile / ".vscode",
-            user_profile / ".vscode-insiders"
-        ]
-        
-        paths['user_data_paths'] = [p for p in user_data_candidates if p.exists()]
-        
-        # Extension paths
-        for user_path in paths['user_data_paths']:
-            ext_path = user_path / "extensions"
-            if ext_path.exists():
-                paths['extension_paths'].append(ext_path)
-        
-        # Cache paths
-        cache_candidates = [
-            local_app_data / "Microsoft" / "VSCode",
-            user_profile / "AppData" / "Local" / "Temp"
-        ]
-        
-        paths['cache_paths'] = [p for p in cache_candidates if p.exists()]
-        
-        return paths
+    def _get_vscode_paths(self) -> PathDiscovery:
+        """Get all possible VSCode installation and data paths, discovered on first use"""
+        return PathDiscovery(self.products, self.environment)
     
     def check_admin_privileges(self) -> bool:
         """Check if script is running with administrator privileges"""
@@ -629,131 +2512,532 @@ Admin Privileges: {'✓ YES' if self.check_admin_privileges() else '✗ NO'}"""
             self.status_text.see('end')
             self.root.update()
         else:
-            print(formatted_message)
-    
-    def run_with_progress(self, func, *args, **kwargs):
-        """Run function with progress tracking"""
-        def worker():
+            print(formatted_message)
+    
+    def run_with_progress(self, func, *args, **kwargs):
+        """Run function with progress tracking"""
+        def worker():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                self.log_status(f"Error: {str(e)}", "ERROR")
+                if GUI_AVAILABLE and self.root:
+                    messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                else:
+                    print(f"Error: {str(e)}")
+        
+        if GUI_AVAILABLE:
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+        else:
+            worker()
+    
+    def create_advanced_backup(self, removing: bool = False):
+        """Create comprehensive backup of VSCode data, letting snapshots hard-link only when ``removing``"""
+        self.log_status("Creating advanced backup...")
+        self.update_progress(10, "Creating backup structure...")
+        
+        try:
+            self._file_manifest = {}
+            self._backup_directories = set()
+            self._content_store = ContentStore(self.store_dir) if self.backup_mode == "store" else None
+            self._previous_backup = None
+            if self._content_store:
+                # Files whose size and mtime match the last stored session are not read again
+                previous_manifest = self._content_store.latest_manifest()
+                if previous_manifest:
+                    self._previous_backup = (self.store_dir, previous_manifest)
+            if self.backup_mode == "incremental":
+                self._previous_backup = self._load_previous_backup()
+                if self._previous_backup:
+                    self.log_status(f"Incremental backup based on {self._previous_backup[0].name}")
+                else:
+                    self.log_status("No previous backup manifest found - taking a full backup", "WARNING")
+            
+            self._reflink_supported = REFLINK_AVAILABLE
+            self._snapshot_hardlinks = removing
+            self._archive = None
+            if self.backup_mode == "archive":
+                self._archive = zipfile.ZipFile(
+                    self.backup_dir / ARCHIVE_NAME, 'w',
+                    compression=zipfile.ZIP_DEFLATED, allowZip64=True
+                )
+            
+            try:
+                self._backup_contents()
+            finally:
+                if self._archive:
+                    self._archive.close()
+                    self._archive = None
+            
+            # Create manifest
+            self.update_progress(90, "Creating backup manifest...")
+            self._create_backup_manifest()
+            self._write_file_manifest()
+            self._record_in_catalog()
+            
+            self.update_progress(100, "Backup completed!")
+            self.log_status("✅ Advanced backup completed successfully")
+            self.backup_created = True
+            
+        except Exception as e:
+            self.log_status(f"Backup failed: {str(e)}", "ERROR")
+            raise
+    
+    def _backup_contents(self):
+        """Backup settings, extensions, registry and Machine ID"""
+        # Backup user settings
+        self.update_progress(20, "Backing up user settings...")
+        for user_path in self.vscode_paths['user_data_paths']:
+            if (user_path / "User").exists():
+                self._backup_tree(user_path / "User", Path("Settings") / user_path.name)
+                self.log_status(f"Backed up settings from {user_path}")
+        
+        # Backup extensions
+        self.update_progress(40, "Backing up extensions...")
+        extensions_list = []
+        extension_records = []
+        for ext_path in self.vscode_paths['extension_paths']:
+            if ext_path.exists():
+                extensions_list.extend([d.name for d in ext_path.iterdir() if d.is_dir()])
+                if self.lean_extensions:
+                    extension_records.extend(self._backup_extensions_lean(ext_path))
+                else:
+                    self._backup_tree(ext_path, Path("Extensions") / ext_path.parent.name)
+        
+        # Save extensions list
+        self._write_backup_json(Path("Extensions") / "extensions_list.json", extensions_list)
+        if self.lean_extensions:
+            self._write_backup_json(Path("Extensions") / "extensions_manifest.json", extension_records)
+        
+        # Backup registry
+        self.update_progress(60, "Backing up registry...")
+        self._backup_registry()
+        
+        # Backup Machine ID
+        self.update_progress(80, "Backing up Machine ID...")
+        self._backup_machine_id()
+    
+    def _backup_extensions_lean(self, ext_path: Path) -> List[Dict]:
+        """Record extension metadata and back up only user-modified files and cached VSIX packages"""
+        relative_root = Path("Extensions") / ext_path.parent.name
+        installed_at = self._read_install_timestamps(ext_path)
+        vsix_caches = self._vsix_cache_dirs(ext_path)
+        rules = self.backup_rules.extended(LEAN_SKIP_DIRS)
+        records = []
+        
+        # extensions.json, .obsolete and friends describe the installed set
+        for item in ext_path.iterdir():
+            if item.is_file():
+                self._backup_file(item, (relative_root / item.name).as_posix(), item.stat())
+        
+        for ext_dir in sorted(d for d in ext_path.iterdir() if d.is_dir()):
+            package = {}
+            package_json = ext_dir / "package.json"
+            try:
+                with open(package_json, 'r', encoding='utf-8') as f:
+                    package = json.load(f)
+            except (OSError, ValueError):
+                pass
+            
+            publisher = package.get('publisher', '')
+            name = package.get('name', '')
+            ext_id = f"{publisher}.{name}".lower() if publisher and name else ext_dir.name.rsplit('-', 1)[0]
+            version = package.get('version', ext_dir.name.rsplit('-', 1)[-1])
+            # The cache is emptied by removal, so the package itself goes into the backup
+            backed_up_vsix = None
+            for cached_vsix in (cache / f"{ext_id}-{version}" for cache in vsix_caches):
+                if cached_vsix.is_file():
+                    backed_up_vsix = f"ExtensionVSIXs/{ext_path.parent.name}/{cached_vsix.name}"
+                    try:
+                        self._backup_file(cached_vsix, backed_up_vsix, cached_vsix.stat())
+                    except OSError as e:
+                        self.log_status(f"Failed to backup {cached_vsix}: {e}", "WARNING")
+                        backed_up_vsix = None
+                    break
+            
+            # Without an install timestamp, package.json is the best proxy for install time
+            install_time = installed_at.get(ext_dir.name)
+            if install_time is None and package_json.exists():
+                install_time = package_json.stat().st_mtime
+            
+            modified_files = []
+            for entry, relative in scan_tree(ext_dir, rules):
+                if entry.is_dir(follow_symlinks=False):
+                    continue
+                file_path = Path(entry.path)
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                is_modified = install_time is None or stat.st_mtime > install_time + LEAN_MTIME_SLACK
+                if file_path != package_json and not is_modified:
+                    continue
+                try:
+                    self._backup_file(file_path, f"{relative_root.as_posix()}/{ext_dir.name}/{relative}", stat)
+                except OSError as e:
+                    self.log_status(f"Failed to backup {file_path}: {e}", "WARNING")
+                    continue
+                if file_path != package_json:
+                    modified_files.append(relative)
+            
+            records.append({
+                'id': ext_id,
+                'version': version,
+                'directory': ext_dir.name,
+                'source': ext_path.parent.name,
+                'package': {key: package[key] for key in LEAN_PACKAGE_FIELDS if key in package},
+                'vsix': backed_up_vsix,
+                'modified_files': modified_files
+            })
+        
+        self.log_status(f"Recorded {len(records)} extensions from {ext_path} (lean mode)")
+        return records
+    
+    def _vsix_cache_dirs(self, ext_path: Path) -> List[Path]:
+        """VSIX cache folders of the product an extension folder belongs to"""
+        # ~/.vscode/extensions is cached in %APPDATA%\Code, a portable data/extensions in data/user-data
+        matches = self.vscode_paths['product_matches']
+        owners = {product for product, _, path in matches if path == ext_path.parent}
+        folders = [path for product, kind, path in matches if product in owners and kind == 'data']
+        folders.append(ext_path.parent / "user-data")
+        return [folder / "CachedExtensionVSIXs" for folder in folders if (folder / "CachedExtensionVSIXs").is_dir()]
+    
+    def _read_install_timestamps(self, ext_path: Path) -> Dict[str, float]:
+        """Map extension folder names to install times from extensions.json"""
+        timestamps = {}
+        try:
+            with open(ext_path / "extensions.json", 'r', encoding='utf-8') as f:
+                installed = json.load(f)
+        except (OSError, ValueError):
+            return timestamps
+        
+        for item in installed if isinstance(installed, list) else []:
+            try:
+                folder = item.get('relativeLocation') or Path(item['location']['path']).name
+                timestamps[folder] = item['metadata']['installedTimestamp'] / 1000
+            except (KeyError, TypeError, AttributeError):
+                continue
+        return timestamps
+    
+    def _backup_tree(self, source: Path, relative_dest: Path, copy: bool = False):
+        """Backup a directory tree according to the selected backup mode, copying if ``copy`` is set"""
+        prefix = relative_dest.as_posix()
+        
+        link = False
+        if self.backup_mode == "snapshot" and not copy:
+            # st_dev identifies the volume; DirEntry.stat() leaves it unset on Windows
+            link = os.stat(source).st_dev == os.stat(self.backup_dir).st_dev
+            if not link:
+                self.log_status(f"{source} is on another volume - snapshot falls back to copying", "WARNING")
+        edited_names = {path.name for path in MACHINE_ID_FILES}
+        
+        def backup_entry(file_path: Path, relative: str, entry: os.DirEntry) -> Optional[int]:
+            # Files rewritten later must not share data with the backup
+            edited = entry.name in edited_names
+            return self._backup_file(file_path, f"{prefix}/{relative}", entry.stat(), link and not edited)
+        
+        def backup_directory(relative: str):
+            self._record_directory(f"{prefix}/{relative}" if relative else prefix)
+        
+        # Archive members are appended one at a time, so extra workers would only contend
+        workers = 1 if self._archive else self.copy_workers
+        backup_directory("")
+        stats = ParallelTreeCopier(workers, rules=self.backup_rules).process_tree(
+            source, backup_entry, backup_directory
+        )
+        
+        for path, error in stats['errors']:
+            self.log_status(f"Failed to backup {path}: {error}", "WARNING")
+        self.log_status(
+            f"Backed up {source}: {stats['files'] - stats['reused']} copied, "
+            f"{stats['reused']} unchanged ({stats['files_per_sec']:.0f} files/s, "
+            f"{stats['bytes_per_sec'] / (1024 * 1024):.1f} MB/s)"
+        )
+    
+    def _backup_file(self, source: Path, relative: str, stat: os.stat_result,
+                     link: bool = False) -> Optional[int]:
+        """Backup a single file, returning bytes written or None if it was reused"""
+        if self.backup_mode == "store":
+            if self._reuse_previous_file(relative, stat):
+                return None
+            digest, size, written = self._content_store.put_file(source)
+            self._record_file(relative, {
+                'size': size,
+                'mtime': stat.st_mtime_ns,
+                HASH_ALGORITHM: digest,
+                'stored': True
+            })
+            return size if written else None
+        
+        if self._archive:
+            digest, size, location = self._archive_file(source, relative)
+            self._record_file(relative, {
+                'size': size,
+                'mtime': stat.st_mtime_ns,
+                HASH_ALGORITHM: digest,
+                'archived': True,
+                **location
+            })
+            return size
+        
+        if self.backup_mode == "incremental" and self._reuse_previous_file(relative, stat):
+            return None
+        
+        destination = self.backup_dir / relative
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        
+        if link:
+            method = self._snapshot_file(source, destination)
+            if method:
+                self._record_file(relative, {
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime_ns,
+                    'link': method
+                })
+                return None
+        
+        digest, size = _copy_and_hash(source, destination)
+        self._record_file(relative, {
+            'size': size,
+            'mtime': stat.st_mtime_ns,
+            HASH_ALGORITHM: digest
+        })
+        return size
+    
+    def _snapshot_file(self, source: Path, destination: Path) -> Optional[str]:
+        """Reflink or hard-link a file into the backup, returning the method used or None to copy"""
+        if not self._snapshot_hardlinks:
+            if self._reflink_supported and _reflink_file(source, destination):
+                return "reflink"
+            self._reflink_supported = False
+            return None
+        if destination.exists() and os.path.samefile(source, destination):
+            # An earlier snapshot into the same folder already linked this file
+            return "hardlink"
+        if self._reflink_supported and _reflink_file(source, destination):
+            return "reflink"
+        # One failed clone means the filesystem doesn't support it
+        self._reflink_supported = False
+        
+        try:
+            os.link(source, destination)
+            return "hardlink"
+        except OSError:
+            return None
+    
+    def _archive_file(self, source: Path, relative: str) -> Tuple[str, int, Dict]:
+        """Stream a file into the backup archive, returning its digest, size and member location"""
+        member = zipfile.ZipInfo.from_file(source, relative)
+        member.compress_type = zipfile.ZIP_STORED if source.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+        digest = hashlib.new(HASH_ALGORITHM)
+        size = 0
+        
+        with self._manifest_lock:
+            # Copy in chunks so memory stays bounded for large files
+            with open(source, 'rb') as fsrc, self._archive.open(member, 'w') as fdst:
+                while True:
+                    chunk = fsrc.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    fdst.write(chunk)
+                    size += len(chunk)
+        
+        location = {'offset': member.header_offset, 'compressed_size': member.compress_size, 'method': member.compress_type}
+        return digest.hexdigest(), size, location
+    
+    def _write_backup_json(self, relative: Path, data):
+        """Write a small JSON document into the backup folder or archive"""
+        self._write_backup_bytes(relative, json.dumps(data, indent=2).encode('utf-8'))
+    
+    def _write_backup_bytes(self, relative: Path, content: bytes):
+        """Write generated content into the backup folder or archive and record it in the manifest"""
+        entry = {
+            'size': len(content),
+            'mtime': int(time.time() * 1e9),
+            HASH_ALGORITHM: hashlib.new(HASH_ALGORITHM, content).hexdigest()
+        }
+        if self._archive:
+            member = zipfile.ZipInfo(relative.as_posix(), time.localtime()[:6])
+            member.compress_type = zipfile.ZIP_DEFLATED
+            with self._manifest_lock:
+                self._archive.writestr(member, content)
+            entry.update(archived=True, offset=member.header_offset,
+                         compressed_size=member.compress_size, method=member.compress_type)
+        else:
+            path = self.backup_dir / relative
+            with open(path, 'wb') as f:
+                f.write(content)
+            entry['mtime'] = path.stat().st_mtime_ns
+        self._record_file(relative.as_posix(), entry)
+    
+    def _record_file(self, relative: str, entry: Dict):
+        """Add an entry to the per-file manifest (called from worker threads)"""
+        with self._manifest_lock:
+            self._file_manifest[relative] = entry
+    
+    def _record_directory(self, relative: str):
+        """Add a directory to the manifest, so empty folders are restored too"""
+        self._backup_directories.add(relative)
+        if not (self._content_store or self._archive):
+            (self.backup_dir / relative).mkdir(parents=True, exist_ok=True)
+    
+    def _reuse_previous_file(self, relative: str, stat: os.stat_result) -> bool:
+        """Hard-link or reference an unchanged file from the previous backup"""
+        if not self._previous_backup:
+            return False
+        
+        previous_dir, previous_manifest = self._previous_backup
+        entry = previous_manifest['files'].get(relative)
+        if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            return False
+        
+        if entry.get('stored'):
+            # A blob pruned from the store since means the file is stored again
+            if self._content_store and not self._content_store.has_object(entry[HASH_ALGORITHM]):
+                return False
+        else:
+            if self._content_store:
+                return False
+            destination = self.backup_dir / relative
+            destination.parent.mkdir(parents=True, exist_ok=True)
             try:
-                func(*args, **kwargs)
-            except Exception as e:
-                self.log_status(f"Error: {str(e)}", "ERROR")
-                if GUI_AVAILABLE and self.root:
-                    messagebox.showerror("Error", f"An error occurred: {str(e)}")
-                else:
-                    print(f"Error: {str(e)}")
+                os.link(previous_dir / relative, destination)
+            except OSError:
+                # Previous copy missing or on another volume - copy from source
+                return False
         
-        if GUI_AVAILABLE:
-            thread = threading.Thread(target=worker)
-            thread.daemon = True
-            thread.start()
-        else:
-            worker()
+        self._record_file(relative, dict(entry))
+        return True
     
-    def create_advanced_backup(self):
-        """Create comprehensive backup of VSCode data"""
-        self.log_status("Creating advanced backup...")
-        self.update_progress(10, "Creating backup structure...")
+    def _get_catalog(self) -> BackupCatalog:
+        """Open the backup catalog, indexing existing backup folders on first use"""
+        catalog = BackupCatalog(self.catalog_path)
+        if catalog.is_empty():
+            desktop = Path.home() / "Desktop"
+            imported = catalog.import_folders(sorted(desktop.glob("VSCode_Backup_*")))
+            if imported:
+                self.log_status(f"Indexed {imported} existing backups in the backup catalog")
+        return catalog
+    
+    def _list_backup_records(self, newest_first: bool = False) -> List[Dict]:
+        """Catalog entries for all known backups, straight from the index"""
+        return self._get_catalog().list_backups(newest_first=newest_first)
+    
+    def _backup_available(self, backup_dir: Path) -> bool:
+        """Check that a selected backup still exists, dropping it from the catalog if not"""
+        if backup_dir.is_dir():
+            return True
+        self.log_status(f"Backup {backup_dir} no longer exists - removed from the catalog", "ERROR")
+        try:
+            self._get_catalog().remove(backup_dir)
+        except sqlite3.Error as e:
+            self.log_status(f"Could not update backup catalog: {e}", "WARNING")
+        return False
+    
+    def _list_backups(self) -> List[Path]:
+        """List known backup directories, oldest first"""
+        return [Path(record['path']) for record in self._list_backup_records()]
+    
+    def _format_backup_record(self, record: Dict) -> str:
+        """One-line description of a catalog entry for menus"""
+        size = f"{record['total_bytes'] / (1024 * 1024):.1f} MB" if record['total_bytes'] is not None else "? MB"
+        files = record['file_count'] if record['file_count'] is not None else "?"
+        return (f"{Path(record['path']).name} | {record['created'][:19].replace('T', ' ')} | "
+                f"{size} | {files} files | {record['mode'] or 'full'} | {record['verification']}")
+    
+    def _load_previous_backup(self) -> Optional[Tuple[Path, Dict]]:
+        """Find the latest earlier backup that has a per-file manifest"""
+        record = self._get_catalog().latest(exclude=self.backup_dir)
+        if not record or not self._backup_available(Path(record['path'])):
+            return None
         
+        manifest_path = Path(record['path']) / "file_manifest.json"
         try:
-            # Backup user settings
-            self.update_progress(20, "Backing up user settings...")
-            for user_path in self.vscode_paths['user_data_paths']:
-                if (user_path / "User").exists():
-                    shutil.copytree(
-                        user_path / "User",
-                        self.backup_dir / "Settings" / user_path.name,
-                        dirs_exist_ok=True
-                    )
-                    self.log_status(f"Backed up settings from {user_path}")
-            
-            # Backup extensions
-            self.update_progress(40, "Backing up extensions...")
-            extensions_list = []
-            for ext_path in self.vscode_paths['extension_paths']:
-                if ext_path.exists():
-                    extensions_list.extend([d.name for d in ext_path.iterdir() if d.is_dir()])
-                    shutil.copytree(
-                        ext_path,
-                        self.backup_dir / "Extensions" / ext_path.parent.name,
-                        dirs_exist_ok=True
-                    )
-            
-            # Save extensions list
-            with open(self.backup_dir / "Extensions" / "extensions_list.json", 'w') as f:
-                json.dump(extensions_list, f, indent=2)
-            
-            # Backup registry
-            self.update_progress(60, "Backing up registry...")
-            self._backup_registry()
-            
-            # Backup Machine ID
-            self.update_progress(80, "Backing up Machine ID...")
-            self._backup_machine_id()
-            
-            # Create manifest
-            self.update_progress(90, "Creating backup manifest...")
-            self._create_backup_manifest()
-            
-            self.update_progress(100, "Backup completed!")
-            self.log_status("✅ Advanced backup completed successfully")
-            self.backup_created = True
-            
-        except Exception as e:
-            self.log_status(f"Backup failed: {str(e)}", "ERROR")
-            raise
+            with open(manifest_path, 'r') as f:
+                return manifest_path.parent, json.load(f)
+        except (OSError, ValueError) as e:
+            self.log_status(f"Ignoring unreadable manifest {manifest_path}: {e}", "WARNING")
+        return None
+    
+    def _record_in_catalog(self):
+        """Add the backup just taken to the backup catalog"""
+        # Without a file manifest, sizes are unknown and the backup cannot be verified
+        has_manifest = bool(self._file_manifest)
+        try:
+            self._get_catalog().record_backup(
+                self.session_id,
+                self.backup_dir,
+                datetime.now().isoformat(),
+                self.backup_mode,
+                sum(e['size'] for e in self._file_manifest.values()) if has_manifest else None,
+                len(self._file_manifest) if has_manifest else None,
+                [str(p) for p in self.vscode_paths['user_data_paths']]
+            )
+        except sqlite3.Error as e:
+            self.log_status(f"Could not update backup catalog: {e}", "WARNING")
+    
+    def _write_file_manifest(self):
+        """Write the per-file manifest for this backup session"""
+        if not self._file_manifest:
+            return
+        
+        uses_store = any(entry.get('stored') for entry in self._file_manifest.values())
+        uses_archive = any(entry.get('archived') for entry in self._file_manifest.values())
+        manifest = {
+            'session_id': self.session_id,
+            'created': datetime.now().isoformat(),
+            'mode': self.backup_mode,
+            'algorithm': HASH_ALGORITHM,
+            'store': str(self.store_dir) if uses_store else None,
+            'archive': ARCHIVE_NAME if uses_archive else None,
+            'directories': sorted(self._backup_directories),
+            'files': self._file_manifest
+        }
+        
+        with open(self.backup_dir / "file_manifest.json", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        if uses_store:
+            ContentStore(self.store_dir).save_manifest(self.session_id, manifest)
+    
+    def _registry_backup_keys(self) -> List[Tuple[str, str]]:
+        """Registry keys of the selected products, as (hive name, key path)"""
+        return [key for product in self.products for key in PRODUCT_PROFILES[product]['registry_keys']]
     
     def _backup_registry(self):
         """Backup VSCode registry entries"""
-        if not WINREG_AVAILABLE:
+        if self.registry_backend is None:
             self.log_status("Registry backup skipped - winreg not available", "WARNING")
             return
-            
-        registry_backup_dir = self.backup_dir / "Registry"
-        
-        # Registry keys to backup
-        keys_to_backup = [
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Classes\Applications\Code.exe"),
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Classes\vscode"),
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Microsoft\VSCode"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Classes\Applications\Code.exe"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Classes\vscode"),
-        ]
         
-        for hive, key_path in keys_to_backup:
+        exporter = RegistryExporter(self.registry_backend)
+        full_snapshot = {}
+        
+        for hive, key_path in self._registry_backup_keys():
             try:
-                # Fixed f-string error
-                backup_name = key_path.replace("\\", "_") + ".reg"
-                backup_file = registry_backup_dir / backup_name
+                snapshot = exporter.export_key(hive, key_path)
+                if not snapshot:
+                    continue
+                full_snapshot.update(snapshot)
                 
-                hive_string = self._hive_to_string(hive)
-                cmd = f'reg export "{hive_string}\\{key_path}" "{backup_file}" /y'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+                # Hive prefix keeps HKCU and HKLM copies of the same path apart
+                backup_name = f"{HIVE_ABBREVIATIONS.get(hive, hive)}_{key_path.replace(chr(92), '_')}.reg"
+                content = ('\ufeff' + RegistryExporter.to_reg(snapshot)).encode('utf-16-le')
+                self._write_backup_bytes(Path("Registry") / backup_name, content)
+                self.log_status(f"Backed up registry key: {hive}\\{key_path} ({len(snapshot)} keys)")
                 
-                if result.returncode == 0:
-                    self.log_status(f"Backed up registry key: {key_path}")
-                else:
-                    self.log_status(f"Failed to backup {key_path}: {result.stderr}", "WARNING")
-                    
             except Exception as e:
                 self.log_status(f"Failed to backup registry key {key_path}: {e}", "WARNING")
-    
-    def _hive_to_string(self, hive):
-        """Convert registry hive constant to string"""
-        if not WINREG_AVAILABLE:
-            return "UNKNOWN"
-            
-        hive_map = {
-            winreg.HKEY_CURRENT_USER: "HKEY_CURRENT_USER",
-            winreg.HKEY_LOCAL_MACHINE: "HKEY_LOCAL_MACHINE",
-            winreg.HKEY_CLASSES_ROOT: "HKEY_CLASSES_ROOT"
-        }
-        return hive_map.get(hive, "UNKNOWN")
+        
+        for key_name, error in exporter.unreadable:
+            self.log_status(f"Skipped unreadable registry key {key_name}: {error}", "WARNING")
+        self._write_backup_json(Path("Registry") / REGISTRY_SNAPSHOT_NAME, full_snapshot)
     
     def _backup_machine_id(self):
         """Backup current Machine ID"""
-        machine_id_dir = self.backup_dir / "MachineID"
-        
         # Get current Machine ID from registry
         current_machine_id = self._get_current_machine_id()
         
@@ -767,18 +3051,13 @@ Admin Privileges: {'✓ YES' if self.check_admin_privileges() else '✗ NO'}"""
             'developer': self.developer
         }
         
-        with open(machine_id_dir / "machine_id_info.json", 'w') as f:
-            json.dump(machine_id_info, f, indent=2)
+        self._write_backup_json(Path("MachineID") / "machine_id_info.json", machine_id_info)
         
         # Backup Machine ID files
         for user_path in self.vscode_paths['user_data_paths']:
             storage_path = user_path / "User" / "globalStorage"
             if storage_path.exists():
-                shutil.copytree(
-                    storage_path,
-                    machine_id_dir / "globalStorage" / user_path.name,
-                    dirs_exist_ok=True
-                )
+                self._backup_tree(storage_path, Path("MachineID") / "globalStorage" / user_path.name, copy=True)
         
         self.machine_id_logger.info(f"Backed up Machine ID: {current_machine_id}")
     
@@ -803,7 +3082,8 @@ Admin Privileges: {'✓ YES' if self.check_admin_privileges() else '✗ NO'}"""
                 'telegram': self.telegram,
                 'created': datetime.now().isoformat(),
                 'session_id': self.session_id,
-                'backup_type': 'Advanced Complete'
+                'backup_type': 'Advanced Complete',
+                'backup_mode': self.backup_mode
             },
             'system_info': {
                 'computer_name': self.computer_name,
@@ -816,6 +3096,13 @@ Admin Privileges: {'✓ YES' if self.check_admin_privileges() else '✗ NO'}"""
                 'user_data_paths': [str(p) for p in self.vscode_paths['user_data_paths']],
                 'install_paths': [str(p) for p in self.vscode_paths['install_paths']]
             },
+            'integrity': {
+                'algorithm': HASH_ALGORITHM,
+                'file_manifest': 'file_manifest.json',
+                'files': len(self._file_manifest),
+                'hashed_files': sum(1 for e in self._file_manifest.values() if HASH_ALGORITHM in e),
+                'total_bytes': sum(e['size'] for e in self._file_manifest.values())
+            },
             'backup_contents': {
                 'settings': 'User settings, keybindings, snippets',
                 'extensions': 'Extension list and configurations',
@@ -881,27 +3168,28 @@ For support and questions:
             self.log_status("Process termination limited - psutil not available", "WARNING")
             # Fallback using subprocess
             try:
-                subprocess.run('taskkill /f /im Code.exe /t', shell=True, capture_output=True)
-                subprocess.run('taskkill /f /im code.exe /t', shell=True, capture_output=True)
-                self.removal_stats['processes_terminated'] = 2
+                terminated = 0
+                for name in self._product_process_names():
+                    result = subprocess.run(['taskkill', '/f', '/im', name, '/t'], capture_output=True)
+                    terminated += result.returncode == 0
+                self.removal_stats['processes_terminated'] = terminated
                 self.log_status("✅ Terminated VSCode processes using taskkill")
             except Exception as e:
                 self.log_status(f"Process termination failed: {e}", "ERROR")
             return
         
-        vscode_process_names = [
-            'Code.exe', 'code.exe', 'CodeHelper.exe', 'VSCodeSetup.exe',
-            'electron.exe', 'node.exe'
-        ]
+        vscode_process_names = {name.lower() for name in self._product_process_names() + HELPER_PROCESS_NAMES}
+        install_roots = [str(p).lower() + os.sep for p in self.vscode_paths['install_paths']]
         
         terminated_count = 0
         
         for proc in psutil.process_iter(['pid', 'name', 'exe', 'cmdline']):
             try:
                 proc_info = proc.info
-                if any(name.lower() in proc_info['name'].lower() for name in vscode_process_names):
+                if (proc_info['name'] or '').lower() in vscode_process_names:
                     # Check if it's actually VSCode related
-                    if proc_info['exe'] and 'vscode' in proc_info['exe'].lower():
+                    exe = (proc_info['exe'] or '').lower()
+                    if exe and ('vscode' in exe or any(exe.startswith(root) for root in install_roots)):
                         self.log_status(f"Terminating process: {proc_info['name']} (PID: {proc_info['pid']})")
                         proc.terminate()
                         terminated_count += 1
@@ -920,41 +3208,235 @@ For support and questions:
         self.removal_stats['processes_terminated'] = terminated_count
         self.log_status(f"✅ Terminated {terminated_count} VSCode processes")
     
+    def reclaim_obsolete_extensions(self, dry_run: bool = False) -> Dict:
+        """Delete superseded and obsolete extension versions, keeping the installed ones
+        
+        Nothing is deleted while the products may be running; dry_run only reports the bytes.
+        """
+        stats = {'extensions_removed': 0, 'bytes_reclaimed': 0, 'errors': []}
+        if not dry_run:
+            running = self._running_product_processes()
+            if running is None or running:
+                reason = (f"{', '.join(sorted(set(running)))} is running" if running
+                          else "could not tell whether VSCode is running")
+                self.log_status(f"Extension reclaim skipped: {reason}. Close VSCode and try again", "ERROR")
+                stats['errors'].append(("", reason))
+                return stats
+        
+        def measure(folder: Path) -> int:
+            return sum(entry.stat(follow_symlinks=False).st_size
+                       for entry, _ in scan_tree(folder) if not entry.is_dir(follow_symlinks=False))
+        
+        for ext_path in self.vscode_paths['extension_paths']:
+            obsolete = find_obsolete_extensions(ext_path)
+            if not obsolete:
+                continue
+            if dry_run:
+                with ThreadPoolExecutor(max_workers=self.copy_workers) as pool:
+                    sizes = list(pool.map(measure, [folder for folder, _ in obsolete]))
+            
+            # The deletion engine spreads each folder over the worker pool
+            for i, (folder, reason) in enumerate(obsolete):
+                if dry_run:
+                    size = sizes[i]
+                else:
+                    deleted = self._delete_tree(folder)
+                    size = deleted['bytes']
+                    stats['bytes_reclaimed'] += size
+                    if deleted['errors']:
+                        stats['errors'].extend(deleted['errors'])
+                        continue
+                if dry_run:
+                    stats['bytes_reclaimed'] += size
+                stats['extensions_removed'] += 1
+                self.log_status(f"{'Would remove' if dry_run else 'Removed'} {folder.name} "
+                                f"({reason}, {size / (1024 * 1024):.1f} MB)")
+            if not dry_run:
+                self._prune_obsolete_file(ext_path)
+        
+        self.log_status(
+            f"✅ {'Reclaimable' if dry_run else 'Reclaimed'}: {stats['extensions_removed']} extension folders, "
+            f"{stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB"
+        )
+        return stats
+    
+    def _prune_obsolete_file(self, ext_path: Path):
+        """Drop .obsolete entries whose folders are gone"""
+        obsolete_file = ext_path / ".obsolete"
+        try:
+            with open(obsolete_file, 'r', encoding='utf-8') as f:
+                marked = json.load(f)
+            remaining = {name: flag for name, flag in marked.items() if (ext_path / name).exists()}
+            if remaining == marked:
+                return
+            if remaining:
+                with open(obsolete_file, 'w', encoding='utf-8') as f:
+                    json.dump(remaining, f)
+            else:
+                obsolete_file.unlink()
+        except (OSError, ValueError, AttributeError) as e:
+            self.log_status(f"Could not update {obsolete_file}: {e}", "WARNING")
+    
+    def _product_process_names(self) -> List[str]:
+        """Executable names of the selected products"""
+        return [name for product in self.products for name in PRODUCT_PROFILES[product]['process_names']]
+    
+    def _running_product_processes(self) -> Optional[List[str]]:
+        """Names of running processes of the selected products, or None when that cannot be told"""
+        wanted = {name.lower() for name in self._product_process_names()}
+        if PSUTIL_AVAILABLE:
+            running = []
+            for proc in psutil.process_iter(['name']):
+                try:
+                    if (proc.info['name'] or '').lower() in wanted:
+                        running.append(proc.info['name'])
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+            return running
+        
+        try:
+            result = subprocess.run(['tasklist', '/fo', 'csv', '/nh'], capture_output=True, text=True)
+        except OSError:
+            return None
+        if result.returncode != 0:
+            return None
+        names = (line.split('","')[0].strip('"') for line in result.stdout.splitlines() if line)
+        return [name for name in names if name.lower() in wanted]
+    
     def remove_directories(self, mode: str = "basic"):
         """Remove VSCode directories based on mode"""
         self.log_status(f"Removing directories ({mode} mode)...")
+        removed = self._remove_directories_of(self.vscode_paths, mode)
+        self.removal_stats['directories_removed'] = removed['directories']
+        self.removal_stats['files_deleted'] += removed['files']
+        self.removal_stats['bytes_deleted'] += removed['bytes']
+        self.log_status(
+            f"✅ Removed {removed['directories']} directories "
+            f"({removed['files']} files, {removed['bytes'] / (1024 * 1024):.1f} MB)"
+            + (f", {removed['failures']} entries could not be deleted" if removed['failures'] else "")
+        )
+    
+    def _remove_directories_of(self, paths: PathDiscovery, mode: str) -> Dict:
+        """Remove the directories one user's discovered paths call for in a mode"""
+        removed = {'directories': 0, 'files': 0, 'bytes': 0, 'failures': 0}
+        targets = sorted(set(paths.removal_targets(mode)), key=lambda p: (len(p.parts), str(p)))
+        # Profile folders such as the home folder or Temp are never removed wholesale
+        protected = {os.path.normcase(os.path.abspath(paths.environment[variable]))
+                     for variable in PROTECTED_PROFILE_FOLDERS if paths.environment.get(variable)}
+        for i, directory in enumerate(targets):
+            # Folders inside another target go along with it
+            if not directory.is_dir() or any(parent in directory.parents for parent in targets[:i]):
+                continue
+            target = os.path.normcase(os.path.abspath(directory))
+            if any(folder == target or folder.startswith(target.rstrip(os.sep) + os.sep) for folder in protected):
+                self.log_status(f"Refusing to remove {directory}: it is or contains a profile folder", "WARNING")
+                continue
+            if self.background_purge and self._get_purger().bury(directory) is not None:
+                removed['directories'] += 1
+                self.log_status(f"Removed directory: {directory} (purging in background)")
+                continue
+            stats = self._delete_tree(directory)
+            removed['files'] += stats['files']
+            removed['bytes'] += stats['bytes']
+            removed['failures'] += len(stats['errors'])
+            if not stats['errors']:
+                removed['directories'] += 1
+                self.log_status(f"Removed directory: {directory}")
+            else:
+                self.log_status(f"Partially removed {directory}: {len(stats['errors'])} entries left", "WARNING")
         
-        directories_to_remove = []
-        
-        if mode in ["basic", "complete", "ultimate"]:
-            directories_to_remove.extend(self.vscode_paths['install_paths'])
-            directories_to_remove.extend(self.vscode_paths['user_data_paths'])
-        
-        if mode in ["complete", "ultimate"]:
-            directories_to_remove.extend(self.vscode_paths['extension_paths'])
-            directories_to_remove.extend(self.vscode_paths['cache_paths'])
-        
-        if mode == "ultimate":
-            # Add additional cleanup paths
-            additional_paths = [
-                Path(os.environ.get('TEMP', '')) / "vscode",
-                Path(os.environ.get('LOCALAPPDATA', '')) / "Microsoft" / "VSCode"
-            ]
-            directories_to_remove.extend(additional_paths)
+        # Later phases must not act on folders that are gone now
+        paths.invalidate()
+        return removed
+    
+    def _get_purger(self) -> TombstonePurger:
+        """Tombstone purger shared by this run's workers, resuming tombstones earlier runs left behind"""
+        with self._purger_lock:
+            if self._purger is None:
+                self._purger = TombstonePurger(self.tombstone_journal_path, log=self.log_status)
+                self._purger.resume()
+            return self._purger
+    
+    def _finish_background_purge(self):
+        """Wait for tombstones still being purged; an interrupted purge resumes on the next run"""
+        if self._purger is None or not self._purger.status()['running']:
+            return
+        print(f"🧹 Waiting for {self._purger.status()['pending']} removed folders to be purged "
+              f"(Ctrl+C to finish on the next run)...")
+        self._purger.wait()
+    
+    def _format_purge_status(self) -> str:
+        """Background purge progress for the removal summary"""
+        if self._purger is None:
+            return "none"
+        status = self._purger.status()
+        return (f"{status['purged']} purged, {status['pending']} pending "
+                f"({status['files']} files, {status['bytes'] / (1024 * 1024):.1f} MB so far)")
+    
+    def _delete_tree(self, path: Path) -> Dict:
+        """Delete a tree with the parallel deletion engine, logging what could not be deleted"""
+        stats = ParallelTreeDeleter(self.copy_workers).delete(path)
+        for failed, error in stats['errors'][:DELETE_ERRORS_LOGGED]:
+            self.log_status(f"Could not delete {failed}: {error}", "WARNING")
+        if len(stats['errors']) > DELETE_ERRORS_LOGGED:
+            self.log_status(f"... and {len(stats['errors']) - DELETE_ERRORS_LOGGED} more under {path}", "WARNING")
+        return stats
+    
+    def sweep_user_profiles(self, users_root: Path = DEFAULT_USERS_ROOT, remove_mode: Optional[str] = None,
+                            workers: Optional[int] = None, confirmed: bool = False) -> Dict[str, Dict]:
+        """Discover, measure and optionally remove VSCode data for every user profile
         
-        removed_count = 0
-        for directory in directories_to_remove:
-            if directory.exists():
+        Only per-user product folders are touched; removal takes no backup, so it must be confirmed.
+        """
+        if remove_mode and not confirmed:
+            raise RuntimeError("Removing every user's VSCode data was not confirmed - sweep aborted")
+        homes = list_user_profiles(Path(users_root))
+        self.log_status(f"Sweeping {len(homes)} user profiles under {users_root}")
+        if remove_mode and self.background_purge:
+            # One purger and journal for all workers, created before they start
+            self._get_purger()
+        workers = max(1, min(workers or self.copy_workers, len(homes) or 1))
+        scan_workers = max(2, self.copy_workers // workers)
+        
+        def sweep(home: Path) -> Dict:
+            paths = PathDiscovery(self.products, user_profile_environment(home))
+            footprint = FootprintScanner(scan_workers).scan(paths.footprint_roots())
+            stats = {
+                'home': str(home),
+                'products': sorted({product for product, _, _ in paths['product_matches'] if product}),
+                'user_data_paths': [str(p) for p in paths['user_data_paths']],
+                'bytes': footprint['total_bytes'],
+                'files': footprint['total_files'],
+                'categories': {
+                    category: {'bytes': totals['bytes'], 'files': totals['files']}
+                    for category, totals in footprint['categories'].items()
+                },
+                'directories_removed': 0,
+                'files_deleted': 0,
+                'bytes_deleted': 0,
+                'errors': [f"{directory}: {error}" for directory, error in footprint['errors']]
+            }
+            if remove_mode:
+                removed = self._remove_directories_of(paths, remove_mode)
+                stats['directories_removed'] = removed['directories']
+                stats['files_deleted'] = removed['files']
+                stats['bytes_deleted'] = removed['bytes']
+                if removed['failures']:
+                    stats['errors'].append(f"{removed['failures']} entries could not be deleted")
+            return stats
+        
+        self.profile_stats = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(sweep, home): home for home in homes}
+            for future in as_completed(futures):
+                home = futures[future]
                 try:
-                    if directory.is_dir():
-                        shutil.rmtree(directory, ignore_errors=True)
-                        self.log_status(f"Removed directory: {directory}")
-                        removed_count += 1
+                    stats = future.result()
                 except Exception as e:
-                    self.log_status(f"Failed to remove {directory}: {e}", "WARNING")
-        
-        self.removal_stats['directories_removed'] = removed_count
-        self.log_status(f"✅ Removed {removed_count} directories")
+                    stats = {'home': str(home), 'errors': [str(e)]}
+                    self.log_status(f"Sweep of {home.name} failed: {e}", "WARNING")
+                self.profile_stats[home.name] = stats
+        return self.profile_stats
     
     def clean_registry(self, mode: str = "basic"):
         """Clean VSCode registry entries"""
@@ -968,10 +3450,9 @@ For support and questions:
         
         # Basic registry cleanup
         basic_keys = [
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Classes\Applications\Code.exe"),
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Classes\vscode"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Classes\Applications\Code.exe"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Classes\vscode"),
+            (getattr(winreg, hive_name), key_path)
+            for product in self.products
+            for hive_name, key_path in PRODUCT_PROFILES[product]['registry_keys']
         ]
         
         for hive, key_path in basic_keys:
@@ -1031,6 +3512,9 @@ For support and questions:
     def _clean_registry_ultimate(self) -> int:
         """Ultimate registry cleanup"""
         keys_removed = 0
+        uninstall_names = tuple(
+            name.lower() for product in self.products for name in PRODUCT_PROFILES[product]['uninstall_names']
+        )
         
         # Remove uninstall entries
         try:
@@ -1042,7 +3526,7 @@ For support and questions:
                         with winreg.OpenKey(uninstall_key, subkey_name) as subkey:
                             try:
                                 display_name, _ = winreg.QueryValueEx(subkey, "DisplayName")
-                                if "visual studio code" in display_name.lower():
+                                if display_name.lower().startswith(uninstall_names):
                                     full_path = f"SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\{subkey_name}"
                                     if self._remove_registry_key(winreg.HKEY_LOCAL_MACHINE, full_path):
                                         keys_removed += 1
@@ -1111,23 +3595,21 @@ For support and questions:
         """Clear Machine ID from VSCode files"""
         for user_path in self.vscode_paths['user_data_paths']:
             # Clear from storage files
-            storage_files = [
-                user_path / "User" / "globalStorage" / "storage.json",
-                user_path / "User" / "state.vscdb"
-            ]
-            
-            for file_path in storage_files:
+            for relative in MACHINE_ID_FILES:
+                file_path = user_path / "User" / relative
                 if file_path.exists():
                     self._clean_machine_id_from_file(file_path)
             
             # Remove workspace storage (contains Machine ID)
             workspace_storage = user_path / "User" / "workspaceStorage"
             if workspace_storage.exists():
-                try:
-                    shutil.rmtree(workspace_storage)
-                    self.log_status(f"Removed workspace storage: {workspace_storage}")
-                except Exception as e:
-                    self.log_status(f"Failed to remove workspace storage: {e}", "WARNING")
+                stats = self._delete_tree(workspace_storage)
+                if stats['errors']:
+                    self.log_status(f"Failed to remove workspace storage: {len(stats['errors'])} entries left", "WARNING")
+                else:
+                    self.log_status(f"Removed workspace storage: {workspace_storage} ({stats['files']} files)")
+        
+        self.vscode_paths.invalidate('workspace_storage_paths')
     
     def _clean_machine_id_from_file(self, file_path: Path):
         """Clean Machine ID references from a file"""
@@ -1142,8 +3624,11 @@ For support and questions:
                     if key in data:
                         del data[key]
                 
-                with open(file_path, 'w', encoding='utf-8') as f:
+                # Write a new file and swap it in, so hard links to the old one keep its content
+                temp_path = file_path.with_name(file_path.name + ".tmp")
+                with open(temp_path, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=2)
+                os.replace(temp_path, file_path)
                 
                 self.log_status(f"Cleaned Machine ID from: {file_path}")
             
@@ -1158,62 +3643,67 @@ For support and questions:
     def _clear_telemetry_data(self):
         """Clear all telemetry and analytics data"""
         for user_path in self.vscode_paths['user_data_paths']:
-            telemetry_paths = [
-                user_path / "User" / "globalStorage" / "vscode.vscode-telemetry",
-                user_path / "User" / "globalStorage" / "ms-vscode.vscode-telemetry",
-                user_path / "CrashDumps",
-                user_path / "CachedData"
-            ]
-            
-            for tel_path in telemetry_paths:
-                if tel_path.exists():
-                    try:
-                        if tel_path.is_dir():
-                            shutil.rmtree(tel_path)
-                        else:
-                            tel_path.unlink()
-                        self.log_status(f"Removed telemetry data: {tel_path}")
-                    except Exception as e:
-                        self.log_status(f"Failed to remove telemetry data {tel_path}: {e}", "WARNING")
+            # Materialise the matches first so nothing is deleted while scandir is open
+            for entry, _ in list(find_matches(user_path, TELEMETRY_RULES)):
+                tel_path = Path(entry.path)
+                stats = self._delete_tree(tel_path)
+                if stats['errors']:
+                    self.log_status(f"Failed to remove telemetry data {tel_path}", "WARNING")
+                else:
+                    self.log_status(f"Removed telemetry data: {tel_path}")
     
     def perform_system_cleanup(self):
-        """Perform additional system cleanup"""
+        """Perform additional system cleanup
+        
+        IPC and Git sockets in Temp are kept while a product may be running.
+        """
         self.log_status("Performing system cleanup...")
         
-        # Clean temp files
-        temp_patterns = ['*vscode*', '*code*']
-        temp_dirs = [
-            Path(os.environ.get('TEMP', '')),
-            Path(os.environ.get('TMP', ''))
-        ]
+        running = self._running_product_processes()
+        live_rules = PathRules(LIVE_TEMP_PATTERNS) if running is None or running else None
+        if live_rules:
+            self.log_status("VSCode may be running: its IPC and Git sockets in Temp are kept", "WARNING")
         
         files_deleted = 0
-        for temp_dir in temp_dirs:
-            for pattern in temp_patterns:
-                try:
-                    for file_path in temp_dir.glob(pattern):
-                        if file_path.is_file():
-                            file_path.unlink()
-                            files_deleted += 1
-                        elif file_path.is_dir():
-                            shutil.rmtree(file_path, ignore_errors=True)
-                            files_deleted += 10  # Estimate
-                except Exception as e:
-                    self.log_status(f"Error cleaning temp files: {e}", "WARNING")
-        
-        # Clean prefetch files
-        prefetch_dir = Path("C:/Windows/Prefetch")
-        if prefetch_dir.exists():
+        bytes_deleted = 0
+        for folder, rules in self._system_cleanup_targets():
             try:
-                for prefetch_file in prefetch_dir.glob("*CODE*.pf"):
-                    prefetch_file.unlink()
-                    files_deleted += 1
-                    self.log_status(f"Removed prefetch: {prefetch_file.name}")
-            except Exception as e:
-                self.log_status(f"Error cleaning prefetch: {e}", "WARNING")
-        
-        self.removal_stats['files_deleted'] = files_deleted
-        self.log_status(f"✅ System cleanup completed. {files_deleted} files removed")
+                with os.scandir(folder) as entries:
+                    matched = [entry for entry in entries
+                               if rules.matches(entry.name, entry.name, entry.is_dir(follow_symlinks=False))
+                               and not (live_rules and live_rules.matches(entry.name, entry.name, False))]
+            except OSError as e:
+                self.log_status(f"Error cleaning {folder}: {e}", "WARNING")
+                continue
+            
+            for entry in matched:
+                stats = self._delete_tree(Path(entry.path))
+                files_deleted += stats['files']
+                bytes_deleted += stats['bytes']
+                if not stats['errors']:
+                    self.log_status(f"Removed {entry.name} from {folder}")
+        
+        self.removal_stats['files_deleted'] += files_deleted
+        self.removal_stats['bytes_deleted'] += bytes_deleted
+        self.vscode_paths.invalidate('temp_entries')
+        self.log_status(f"✅ System cleanup completed. {files_deleted} files removed "
+                        f"({bytes_deleted / (1024 * 1024):.1f} MB)")
+    
+    def _system_cleanup_targets(self) -> List[Tuple[Path, PathRules]]:
+        """Temp and Prefetch folders with the rules for the selected products, each folder once"""
+        temp_rules = temp_signature_rules(self.products)
+        # Prefetch files are named after the executable they describe
+        prefetch_rules = PathRules(f"{name}-*.pf" for name in self._product_process_names())
+        
+        folders = [(self.environment.get(variable), temp_rules) for variable in ('TEMP', 'TMP')]
+        system_root = self.environment.get('SYSTEMROOT') or r"C:\Windows"
+        folders.append((os.path.join(system_root, "Prefetch"), prefetch_rules))
+        
+        targets = {}
+        for folder, rules in folders:
+            if folder and os.path.isdir(folder):
+                targets.setdefault(os.path.normcase(os.path.realpath(folder)), (Path(folder), rules))
+        return list(targets.values())
     
     def show_removal_summary(self, removal_type: str):
         """Show comprehensive removal summary"""
@@ -1231,6 +3721,7 @@ For support and questions:
 ├── Directories removed: {self.removal_stats['directories_removed']}
 ├── Registry keys cleaned: {self.removal_stats['registry_keys_removed']}
 ├── Files deleted: {self.removal_stats['files_deleted']}
+├── Background purge: {self._format_purge_status()}
 └── Machine ID reset: {'✅ YES' if self.removal_stats['machine_id_reset'] else '❌ NO'}
 
 📁 BACKUP INFORMATION:
@@ -1296,7 +3787,8 @@ For support and questions:
                 
                 # Create backup
                 self.update_progress(10, "Creating backup...")
-                self.create_advanced_backup()
+                self.create_advanced_backup(removing=True)
+                self._require_verified_backup()
                 
                 # Terminate processes
                 self.update_progress(30, "Terminating processes...")
@@ -1350,7 +3842,8 @@ For support and questions:
                 
                 # Create backup
                 self.update_progress(5, "Creating comprehensive backup...")
-                self.create_advanced_backup()
+                self.create_advanced_backup(removing=True)
+                self._require_verified_backup()
                 
                 # Terminate processes
                 self.update_progress(20, "Terminating all processes...")
@@ -1428,7 +3921,8 @@ For support and questions:
                 
                 # Create comprehensive backup
                 self.update_progress(3, "Creating comprehensive backup...")
-                self.create_advanced_backup()
+                self.create_advanced_backup(removing=True)
+                self._require_verified_backup()
                 
                 # Create system restore point
                 self.update_progress(8, "Creating system restore point...")
@@ -1534,15 +4028,171 @@ For support and questions:
         
         self.run_with_progress(backup_process)
     
-    def system_analysis(self):
-        """Analyze VSCode system footprint"""
-        if GUI_AVAILABLE:
+    def system_analysis(self, stream: Optional[TextIO] = None):
+        """Analyze VSCode system footprint, as NDJSON records when a stream is given"""
+        if stream is not None:
+            self.stream_analysis(stream)
+        elif GUI_AVAILABLE:
             SystemAnalysisDialog(self)
         else:
             self._console_system_analysis()
     
-    def _console_system_analysis(self):
-        """Console version of system analysis"""
+    def analyze_footprint(self, use_cache: bool = True,
+                          on_directory: Optional[Callable[[str, str, str, list], None]] = None,
+                          report_errors: bool = True, consumers: Optional[LargestConsumers] = None) -> Dict:
+        """Bytes and file counts for installs, user data, extensions, caches and workspaceStorage"""
+        cache = None
+        if use_cache:
+            try:
+                cache = FootprintCache(self.footprint_cache_path)
+            except sqlite3.Error as e:
+                self.log_status(f"Footprint cache unavailable, listing every directory: {e}", "WARNING")
+        
+        try:
+            result = FootprintScanner(self.copy_workers, cache).scan(
+                self.vscode_paths.footprint_roots(), on_directory, consumers
+            )
+            if cache is not None:
+                cache.prune()
+        finally:
+            if cache is not None:
+                cache.close()
+        if cache is not None and cache.error:
+            self.log_status(f"Could not save footprint cache: {cache.error}", "WARNING")
+        if report_errors:
+            for directory, error in result['errors']:
+                self.log_status(f"Could not scan {directory}: {error}", "WARNING")
+        return result
+    
+    def largest_consumers(self, top: int = TOP_CONSUMERS, max_depth: int = TOP_CONSUMER_DEPTH,
+                          use_cache: bool = True) -> List[Dict]:
+        """Largest subtrees and files of every user data root, with the product it belongs to"""
+        finder = self._largest_consumer_finder(top, max_depth)
+        self.analyze_footprint(use_cache, consumers=finder)
+        return self._consumer_reports(finder)
+    
+    def _largest_consumer_finder(self, top: int = TOP_CONSUMERS,
+                                 max_depth: int = TOP_CONSUMER_DEPTH) -> LargestConsumers:
+        """Consumers of the user data roots, with portable extension folders as roots of their own"""
+        roots = self.vscode_paths['user_data_paths']
+        roots += [p for p in self.vscode_paths['extension_paths']
+                  if not any(root in p.parents for root in roots)]
+        return LargestConsumers(roots, top, max_depth)
+    
+    def _consumer_reports(self, finder: LargestConsumers) -> List[Dict]:
+        """Reports of a finder fed by a footprint analysis, with the product of each root"""
+        reports = finder.reports()
+        for report in reports:
+            report['product'] = self.vscode_paths.product_of(Path(report['root']))
+        return reports
+    
+    def _format_largest_consumers(self, reports: List[Dict]) -> List[str]:
+        """Largest-consumer report lines"""
+        lines = []
+        for report in reports:
+            product = PRODUCT_PROFILES[report['product']]['name'] if report['product'] else "Unknown product"
+            lines.append(f"{product}: {report['root']} "
+                         f"({report['bytes'] / (1024 * 1024):.1f} MB, {report['files']} files)")
+            lines.append("  Largest folders:")
+            for path, size in report['subtrees']:
+                lines.append(f"    {size / (1024 * 1024):>10.1f} MB  {os.path.relpath(path, report['root'])}")
+            lines.append("  Largest files:")
+            for path, size in report['largest_files']:
+                lines.append(f"    {size / (1024 * 1024):>10.1f} MB  {os.path.relpath(path, report['root'])}")
+        return lines
+    
+    def stream_analysis(self, out: TextIO, use_cache: bool = True, top: Optional[int] = None) -> Dict:
+        """Write the system analysis as NDJSON, one record per line as items are found"""
+        def emit(record: Dict):
+            out.write(json.dumps(record, separators=(',', ':')) + "\n")
+        
+        emit({
+            'type': 'session',
+            'session_id': self.session_id,
+            'host': self.computer_name,
+            'user': self.current_user,
+            'version': self.version,
+            'started': datetime.now().isoformat()
+        })
+        
+        products = {}
+        for category, paths in self.vscode_paths.footprint_roots().items():
+            for path in paths:
+                products[os.path.normcase(os.path.abspath(path))] = product = self.vscode_paths.product_of(path)
+                emit({'type': 'root', 'category': category, 'product': product, 'path': str(path)})
+        
+        def on_directory(category: str, root: str, directory: str, record: list):
+            emit({
+                'type': 'directory',
+                'category': category,
+                'product': products.get(root),
+                'path': directory,
+                'bytes': record[4],
+                'files': record[3],
+                'mtime': record[0] / 1e9
+            })
+        
+        finder = self._largest_consumer_finder(top) if top else None
+        footprint = self.analyze_footprint(use_cache, on_directory, report_errors=False, consumers=finder)
+        for directory, error in footprint['errors']:
+            emit({'type': 'error', 'path': directory, 'error': error})
+        for category, totals in footprint['categories'].items():
+            emit({
+                'type': 'category',
+                'category': category,
+                'bytes': totals['bytes'],
+                'files': totals['files'],
+                'directories': totals['directories']
+            })
+        if finder is not None:
+            for report in self._consumer_reports(finder):
+                for kind, items in (('folder', report['subtrees']), ('file', report['largest_files'])):
+                    for rank, (path, size) in enumerate(items, 1):
+                        emit({
+                            'type': 'consumer',
+                            'kind': kind,
+                            'rank': rank,
+                            'product': report['product'],
+                            'root': report['root'],
+                            'path': path,
+                            'bytes': size
+                        })
+        emit({
+            'type': 'summary',
+            'bytes': footprint['total_bytes'],
+            'files': footprint['total_files'],
+            'cached_directories': footprint['cached_directories'],
+            'machine_id': self._get_current_machine_id(),
+            'elapsed': footprint['elapsed']
+        })
+        out.flush()
+        return footprint
+    
+    def _format_footprint(self, footprint: Dict) -> List[str]:
+        """Footprint report lines shared by the console and the GUI"""
+        labels = {
+            'installs': "Installations",
+            'user_data': "User data",
+            'extensions': "Extensions",
+            'caches': "Caches",
+            'workspace_storage': "workspaceStorage"
+        }
+        lines = []
+        for category in FOOTPRINT_CATEGORIES:
+            totals = footprint['categories'][category]
+            lines.append(
+                f"{labels[category]:<18} {totals['bytes'] / (1024 * 1024):>10.1f} MB "
+                f"{totals['files']:>9} files"
+            )
+        lines.append(
+            f"{'Total':<18} {footprint['total_bytes'] / (1024 * 1024):>10.1f} MB "
+            f"{footprint['total_files']:>9} files  (scanned in {footprint['elapsed']:.2f}s, "
+            f"{footprint['cached_directories']} directories unchanged)"
+        )
+        return lines
+    
+    def _console_system_analysis(self, use_cache: bool = True, top: Optional[int] = None):
+        """Console version of system analysis, with the top largest consumers from the same walk"""
         print("\n=== VSCODE SYSTEM ANALYSIS ===")
         print(f"Tool by: {self.developer} | Support: {self.telegram}")
         print("-" * 50)
@@ -1557,6 +4207,16 @@ For support and questions:
         for i, path in enumerate(self.vscode_paths['user_data_paths'], 1):
             print(f"  {i}. {path}")
         
+        # Disk footprint
+        print("\n💾 DISK FOOTPRINT:")
+        finder = self._largest_consumer_finder(top) if top else None
+        for line in self._format_footprint(self.analyze_footprint(use_cache, consumers=finder)):
+            print(f"  {line}")
+        if finder is not None:
+            print("\n📊 LARGEST SPACE CONSUMERS:")
+            for line in self._format_largest_consumers(self._consumer_reports(finder)):
+                print(f"  {line}")
+        
         # Process analysis
         if PSUTIL_AVAILABLE:
             vscode_processes = []
@@ -1589,29 +4249,341 @@ For support and questions:
         print("\n=== RESTORE BACKUP ===")
         print(f"Tool by: {self.developer} | Support: {self.telegram}")
         
-        # Scan for backups
-        desktop = Path.home() / "Desktop"
-        backup_dirs = list(desktop.glob("VSCode_Backup_*"))
+        # Look up backups in the catalog
+        records = self._list_backup_records(newest_first=True)
+        backup_dirs = [Path(record['path']) for record in records]
         
         if not backup_dirs:
-            print("No backups found on desktop.")
+            print("No backups found.")
             return
         
         print("Available backups:")
-        for i, backup_dir in enumerate(backup_dirs, 1):
-            print(f"  [{i}] {backup_dir.name}")
+        for i, record in enumerate(records, 1):
+            print(f"  [{i}] {self._format_backup_record(record)}")
         
         try:
             choice = int(input(f"\nSelect backup (1-{len(backup_dirs)}): ")) - 1
             selected_backup = backup_dirs[choice]
-            
+        except (ValueError, IndexError):
+            print("Invalid selection.")
+            return
+        
+        pattern = input("File or folder to restore (e.g. settings.json, Settings/Code/snippets; Enter = everything): ").strip()
+        if pattern:
+            matches = BackupReader(selected_backup).select(pattern)
+            if not matches:
+                print(f"No files in this backup match '{pattern}'.")
+                return
+            print(f"{len(matches)} matching files:")
+            for relative in matches[:20]:
+                print(f"  {relative}")
+            if len(matches) > 20:
+                print(f"  ... and {len(matches) - 20} more")
+            if input("Restore these files? (y/N): ").strip().lower() != 'y':
+                return
+            ok = self.restore_files(selected_backup, pattern)
+        else:
             print(f"Restoring from: {selected_backup}")
-            # Implement basic restore logic here
+            ok = self.restore_from_backup(selected_backup)
+        
+        if ok:
             print("✅ Restore completed!")
-            print(f"📞 For support contact: {self.telegram}")
-            
+        else:
+            print("⚠️ Restore finished with errors - run it again to resume")
+        print(f"📞 For support contact: {self.telegram}")
+    
+    def restore_files(self, backup_dir: Path, pattern: str, target_dir: Optional[Path] = None,
+                      delta: bool = True) -> bool:
+        """Restore only the files matching pattern from a backup, below target_dir if one is given"""
+        backup_dir = Path(backup_dir)
+        if not self._backup_available(backup_dir):
+            return False
+        reader = BackupReader(backup_dir)
+        selected = reader.select(pattern)
+        if not selected:
+            self.log_status(f"No files in {backup_dir.name} match '{pattern}'", "WARNING")
+            return False
+        
+        if target_dir is not None:
+            target_dir = Path(target_dir)
+        else:
+            targets = self._restore_targets(backup_dir)
+        
+        def destination_for(relative: str) -> Optional[Path]:
+            if target_dir is not None:
+                return target_dir / Path(*relative.split('/'))
+            return self._restore_destination(relative, targets)
+        
+        # Each selection gets its own journal so it never masks files of a full restore
+        selection_id = hashlib.sha1("\n".join(selected).encode('utf-8')).hexdigest()[:12]
+        engine = RestoreEngine(
+            reader,
+            destination_for,
+            self.temp_dir / f"restore_{backup_dir.name}_{selection_id}.journal",
+            self.copy_workers,
+            delta=delta,
+            only=selected
+        )
+        stats = engine.run()
+        self.vscode_paths.invalidate()
+        
+        for relative, error in stats['errors']:
+            self.log_status(f"Failed to restore {relative}: {error}", "WARNING")
+        self.log_status(
+            f"Restored {stats['files']} of {len(selected)} matching files "
+            f"({stats['bytes'] / (1024 * 1024):.1f} MB) from {backup_dir.name} in {stats['elapsed']:.2f}s"
+            + (f", {stats['skipped']} already identical" if stats['skipped'] else "")
+        )
+        return not stats['errors']
+    
+    def restore_from_backup(self, backup_dir: Path, delta: bool = True) -> bool:
+        """Restore settings, extensions, Machine ID data and registry from a backup"""
+        backup_dir = Path(backup_dir)
+        if not self._backup_available(backup_dir):
+            return False
+        self.log_status(f"Restoring backup {backup_dir.name}...")
+        self.update_progress(5, "Reading backup manifest...")
+        
+        reader = BackupReader(backup_dir)
+        targets = self._restore_targets(backup_dir)
+        journal_path = self.temp_dir / f"restore_{backup_dir.name}.journal"
+        if journal_path.exists():
+            self.log_status("Resuming interrupted restore from checkpoint journal")
+        
+        # Lean backups hold only metadata and modified files of each extension
+        lean_manifest = reader.read_extra("Extensions/extensions_manifest.json")
+        unrestorable = {}
+        if lean_manifest:
+            self.update_progress(8, "Reinstalling extensions from backed-up VSIX packages...")
+            unrestorable = self._reinstall_lean_extensions(reader, json.loads(lean_manifest), targets)
+        
+        def destination_for(relative: str) -> Optional[Path]:
+            parts = relative.split('/')
+            # A lone package.json and a few edited files would only make a broken extension
+            if parts[0] == "Extensions" and len(parts) > 3 and parts[2] in unrestorable.get(parts[1], ()):
+                return None
+            return self._restore_destination(relative, targets)
+        
+        self.update_progress(10, "Restoring files...")
+        engine = RestoreEngine(reader, destination_for, journal_path, self.copy_workers, delta=delta)
+        stats = engine.run()
+        for source, directories in unrestorable.items():
+            extensions_dir = self._restore_destination(f"Extensions/{source}/extensions.json", targets).parent
+            self._drop_installed_extensions(extensions_dir, directories)
+        # Restored files may have recreated folders that discovery found missing
+        self.vscode_paths.invalidate()
+        
+        for relative, error in stats['errors']:
+            self.log_status(f"Failed to restore {relative}: {error}", "WARNING")
+        self.log_status(
+            f"Restored {stats['files']} files ({stats['bytes'] / (1024 * 1024):.1f} MB) "
+            f"in {stats['elapsed']:.1f}s, {stats['resumed']} already restored"
+        )
+        if stats['skipped']:
+            self.log_status(
+                f"Skipped {stats['skipped']} files already identical on disk "
+                f"({stats['skipped_bytes'] / (1024 * 1024):.1f} MB not copied)"
+            )
+        
+        self.update_progress(80, "Restoring registry...")
+        with reader:
+            self._restore_registry(reader)
+        missing = sorted(directory for directories in unrestorable.values() for directory in directories)
+        if missing:
+            self.log_status(f"{len(missing)} extensions were backed up as metadata only and had no cached VSIX; "
+                            f"reinstall them from the marketplace: {', '.join(missing)}", "WARNING")
+        
+        self.update_progress(100, "Restore completed!")
+        ok = not stats['errors']
+        if ok:
+            self.log_status("✅ Restore completed successfully")
+        return ok
+    
+    def _reinstall_lean_extensions(self, reader: BackupReader, records: List[Dict],
+                                   targets: Dict[str, Path]) -> Dict[str, set]:
+        """Unpack lean-backed-up extensions from their backed-up VSIX packages
+        
+        Returns the folders, grouped by user data folder, that could not be restored.
+        """
+        unrestorable = {}
+        reinstalled = 0
+        for record in records:
+            ext_dir = self._restore_destination(f"Extensions/{record['source']}/{record['directory']}", targets)
+            vsix = record.get('vsix')
+            if vsix and vsix in reader.files:
+                try:
+                    # Archive members cannot seek, which zipfile needs
+                    with reader.open(vsix) as fsrc, tempfile.TemporaryFile(dir=self.temp_dir) as package:
+                        shutil.copyfileobj(fsrc, package, COPY_CHUNK_SIZE)
+                        self._extract_vsix(package, ext_dir)
+                    reinstalled += 1
+                    continue
+                except (OSError, zipfile.BadZipFile) as e:
+                    self.log_status(f"Could not unpack {vsix}: {e}", "WARNING")
+            unrestorable.setdefault(record['source'], set()).add(record['directory'])
+        if reinstalled:
+            self.log_status(f"Reinstalled {reinstalled} extensions from their backed-up VSIX packages")
+        return unrestorable
+    
+    @staticmethod
+    def _extract_vsix(vsix, ext_dir: Path):
+        """Unpack the extension/ folder of a VSIX package (a path or file) into an extension folder"""
+        with zipfile.ZipFile(vsix) as package:
+            for member in package.infolist():
+                relative = member.filename[len("extension/"):]
+                if member.is_dir() or not member.filename.startswith("extension/") or '..' in relative.split('/'):
+                    continue
+                target = ext_dir / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with package.open(member) as fsrc, open(target, 'wb') as fdst:
+                    shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+    
+    def _drop_installed_extensions(self, extensions_dir: Path, directories: set):
+        """Remove extensions that were not restored from extensions.json, so VSCode does not load them"""
+        path = extensions_dir / "extensions.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                installed = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(installed, list):
+            return
+        
+        def folder(item) -> Optional[str]:
+            try:
+                return item.get('relativeLocation') or Path(item['location']['path']).name
+            except (KeyError, TypeError, AttributeError):
+                return None
+        
+        kept = [item for item in installed if folder(item) not in directories]
+        if len(kept) != len(installed):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(kept, f)
+    
+    def _restore_targets(self, backup_dir: Path) -> Dict[str, Path]:
+        """Map user data folder names in a backup to their original locations"""
+        targets = {}
+        try:
+            with open(backup_dir / "backup_manifest.json", 'r') as f:
+                recorded = json.load(f)['vscode_info']['user_data_paths']
+            targets.update({Path(p).name: Path(p) for p in recorded})
+        except (OSError, ValueError, KeyError):
+            pass
+        for user_path in self.vscode_paths['user_data_paths']:
+            targets.setdefault(user_path.name, user_path)
+        return targets
+    
+    def _restore_destination(self, relative: str, targets: Dict[str, Path]) -> Optional[Path]:
+        """Work out where a backed-up file belongs, or None for backup metadata"""
+        parts = relative.split('/')
+        if len(parts) < 3:
+            return None
+        
+        def user_data(name: str) -> Path:
+            if name in targets:
+                return targets[name]
+            base = self.environment.get('USERPROFILE', '') if name.startswith('.') else self.environment.get('APPDATA', '')
+            return Path(base) / name
+        
+        if parts[0] == "Settings":
+            return user_data(parts[1]) / "User" / Path(*parts[2:])
+        if parts[0] == "Extensions":
+            return user_data(parts[1]) / "extensions" / Path(*parts[2:])
+        if parts[0] == "MachineID" and parts[1] == "globalStorage" and len(parts) > 3:
+            return user_data(parts[2]) / "User" / "globalStorage" / Path(*parts[3:])
+        return None
+    
+    def _restore_registry(self, reader: BackupReader):
+        """Import registry keys from a backup"""
+        snapshot_data = reader.read_extra(f"Registry/{REGISTRY_SNAPSHOT_NAME}")
+        
+        if snapshot_data and self.registry_backend is not None:
+            snapshot = json.loads(snapshot_data)
+            # Snapshot order is parent-first, so keys are created top-down
+            for key_name, data in snapshot.items():
+                hive, _, path = key_name.partition('\\')
+                values = [(v['name'], _decode_reg_data(v['data']), v['type']) for v in data['values']]
+                try:
+                    self.registry_backend.write_key(hive, path, values)
+                except Exception as e:
+                    self.log_status(f"Failed to restore registry key {key_name}: {e}", "WARNING")
+            self.log_status(f"Restored {len(snapshot)} registry keys")
+            return
+        
+        # Backups taken before the registry snapshot existed only have .reg files
+        registry_dir = reader.backup_dir / "Registry"
+        if not WINREG_AVAILABLE or not registry_dir.exists():
+            self.log_status("Registry restore skipped", "WARNING")
+            return
+        for reg_file in registry_dir.glob("*.reg"):
+            result = subprocess.run(['reg', 'import', str(reg_file)], capture_output=True, text=True)
+            if result.returncode == 0:
+                self.log_status(f"Imported registry file: {reg_file.name}")
+            else:
+                self.log_status(f"Failed to import {reg_file.name}: {result.stderr}", "WARNING")
+    
+    def verify_backup(self, backup_dir: Optional[Path] = None, sample: Optional[float] = None) -> bool:
+        """Verify a backup against its per-file manifest"""
+        backup_dir = Path(backup_dir) if backup_dir else self.backup_dir
+        if not self._backup_available(backup_dir):
+            return False
+        if not (backup_dir / "file_manifest.json").exists():
+            self.log_status(f"Cannot verify {backup_dir.name}: no file manifest", "ERROR")
+            return False
+        
+        mode = f"sampled ({sample:.0%})" if sample is not None else "full"
+        self.log_status(f"Verifying backup {backup_dir.name} ({mode})...")
+        result = BackupVerifier(backup_dir).verify(sample=sample)
+        
+        for relative, reason in result['failures']:
+            self.log_status(f"Corrupt backup file {relative}: {reason}", "ERROR")
+        
+        try:
+            state = ('verified' if result['ok'] else 'corrupt') + (' (sampled)' if sample is not None else '')
+            self._get_catalog().set_verification(backup_dir, state)
+        except sqlite3.Error as e:
+            self.log_status(f"Could not update backup catalog: {e}", "WARNING")
+        
+        if result['ok']:
+            self.log_status(
+                f"✅ Verified {result['checked']} of {result['total_files']} files "
+                f"({result['bytes'] / (1024 * 1024):.1f} MB) in {result['elapsed']:.1f}s"
+            )
+        else:
+            self.log_status(f"❌ Backup {backup_dir.name} failed verification", "ERROR")
+        return result['ok']
+    
+    def _require_verified_backup(self):
+        """Stop a removal unless the backup just taken passes sampled verification"""
+        if not self._file_manifest:
+            # Nothing was found to back up, so there is nothing to verify
+            return
+        if not self.verify_backup(self.backup_dir, sample=VERIFY_SAMPLE_RATE):
+            raise RuntimeError("Backup verification failed - removal aborted")
+    
+    def _console_verify_backup(self):
+        """Console version of backup verification"""
+        print("\n=== VERIFY BACKUP ===")
+        
+        records = [r for r in self._list_backup_records(newest_first=True) if r['file_count'] is not None]
+        backup_dirs = [Path(record['path']) for record in records]
+        if not backup_dirs:
+            print("No verifiable backups found.")
+            return
+        
+        print("Available backups:")
+        for i, record in enumerate(records, 1):
+            print(f"  [{i}] {self._format_backup_record(record)}")
+        
+        try:
+            choice = int(input(f"\nSelect backup (1-{len(backup_dirs)}): ")) - 1
+            selected_backup = backup_dirs[choice]
         except (ValueError, IndexError):
             print("Invalid selection.")
+            return
+        
+        full = input("Full verification? Otherwise a fast random sample is checked (y/N): ").strip().lower() == 'y'
+        self.verify_backup(selected_backup, sample=None if full else VERIFY_SAMPLE_RATE)
     
     def reset_machine_id_only(self):
         """Reset only Machine ID without removal"""
@@ -1707,6 +4679,8 @@ For support and questions:
             print("[6] System Analysis")
             print("[7] Reset Machine ID")
             print("[8] Contact Developer")
+            print("[9] Verify Backup")
+            print("[10] Reclaim Obsolete Extensions")
             print("[0] Exit")
             
             choice = input("\nEnter your choice: ").strip()
@@ -1727,6 +4701,10 @@ For support and questions:
                 self.reset_machine_id_only()
             elif choice == '8':
                 self._open_telegram()
+            elif choice == '9':
+                self._console_verify_backup()
+            elif choice == '10':
+                self.reclaim_obsolete_extensions()
             elif choice == '0':
                 break
             else:
@@ -1748,9 +4726,15 @@ For support and questions:
             self.log_status("VSCode Ultimate Removal Tool started")
             self.log_status(f"Session ID: {self.session_id}")
             self.log_status(f"Developer: {self.developer}")
+            if self.tombstone_journal_path.exists():
+                self._get_purger()
+            # Tombstones left when the window closes are resumed on the next start
             self.root.mainloop()
         else:
+            if self.tombstone_journal_path.exists():
+                self._get_purger()
             self.run_console_mode()
+            self._finish_background_purge()
 
 # Dialog classes for GUI mode (simplified versions)
 class CustomRemovalDialog:
@@ -1874,12 +4858,35 @@ class SystemAnalysisDialog:
         self.analysis_text.insert('end', f"🔍 VSCode System Analysis - by {self.parent.developer}\n")
         self.analysis_text.insert('end', f"📱 Support: {self.parent.telegram}\n")
         self.analysis_text.insert('end', "=" * 60 + "\n\n")
+        self._pending = self.analysis_text.index('end-1c')
+        self.analysis_text.insert('end', "⏳ Analyzing...\n")
         
-        # Basic analysis
-        self.analysis_text.insert('end', f"📦 Installations: {len(self.parent.vscode_paths['install_paths'])}\n")
-        self.analysis_text.insert('end', f"👤 User Data: {len(self.parent.vscode_paths['user_data_paths'])}\n")
-        
+        # Discovery and the footprint walk run on a worker so the window stays responsive
+        self.parent.run_with_progress(self._collect_analysis)
+    
+    def _collect_analysis(self):
+        """Gather the analysis off the Tk thread and hand it to the dialog"""
+        installs = len(self.parent.vscode_paths['install_paths'])
+        user_data = len(self.parent.vscode_paths['user_data_paths'])
+        footprint = self.parent._format_footprint(self.parent.analyze_footprint())
         machine_id = self.parent._get_current_machine_id()
+        try:
+            self.dialog.after(0, self._show_analysis, installs, user_data, footprint, machine_id)
+        except tk.TclError:
+            # The dialog was closed while the analysis ran
+            pass
+    
+    def _show_analysis(self, installs: int, user_data: int, footprint: List[str], machine_id: Optional[str]):
+        """Insert the collected analysis into the dialog"""
+        self.analysis_text.delete(self._pending, 'end')
+        self.analysis_text.insert('end', f"📦 Installations: {installs}\n")
+        self.analysis_text.insert('end', f"👤 User Data: {user_data}\n")
+        
+        self.analysis_text.insert('end', "\n💾 Disk footprint:\n")
+        for line in footprint:
+            self.analysis_text.insert('end', f"  {line}\n")
+        self.analysis_text.insert('end', "\n")
+        
         self.analysis_text.insert('end', f"🆔 Machine ID: {machine_id if machine_id else 'Not found'}\n")
         
         self.analysis_text.insert('end', "\n✅ Analysis completed!\n")
@@ -1916,24 +4923,244 @@ class RestoreBackupDialog:
         # Support info
         ttk.Label(main_frame, text=f"Support: {self.parent.telegram}", foreground='#0088cc').pack()
         
-        # Simple restore message
-        message_label = ttk.Label(
+        # Backup list
+        records = self.parent._list_backup_records(newest_first=True)
+        self.backup_dirs = [Path(record['path']) for record in records]
+        self.backup_list = tk.Listbox(
             main_frame,
-            text="Backup restoration feature available.\nFor detailed restoration support, please contact the developer.",
-            font=('Arial', 12),
-            justify='center'
+            height=10,
+            bg='#1e1e1e',
+            fg='#d4d4d4',
+            font=('Consolas', 9)
         )
-        message_label.pack(pady=50)
+        for record in records:
+            self.backup_list.insert('end', self.parent._format_backup_record(record))
+        self.backup_list.pack(fill='both', expand=True, pady=20)
         
         # Buttons
         button_frame = ttk.Frame(main_frame)
-        button_frame.pack(pady=20)
+        button_frame.pack(pady=10)
         
+        ttk.Button(button_frame, text="🔄 Restore Selected", command=self._start_restore).pack(side='left', padx=10)
         ttk.Button(button_frame, text="📱 Contact Developer", command=self.parent._open_telegram).pack(side='left', padx=10)
         ttk.Button(button_frame, text="Close", command=self.dialog.destroy).pack(side='left', padx=10)
+    
+    def _start_restore(self):
+        """Restore the selected backup"""
+        selection = self.backup_list.curselection()
+        if not selection:
+            messagebox.showwarning("Restore Backup", "Please select a backup first.")
+            return
+        
+        backup_dir = self.backup_dirs[selection[0]]
+        if not messagebox.askyesno("Restore Backup", f"Restore VSCode data from {backup_dir.name}?"):
+            return
+        self.dialog.destroy()
+        self.parent.run_with_progress(self.parent.restore_from_backup, backup_dir)
+
+def parse_arguments(argv: Optional[List[str]] = None):
+    """Parse command line arguments"""
+    import argparse
+    # Prefixes are rejected so --backup is never taken for --backup-mode
+    parser = argparse.ArgumentParser(description="VSCode Ultimate Removal Tool", allow_abbrev=False)
+    parser.add_argument(
+        '--console',
+        action='store_true',
+        help="run the interactive menu in the terminal instead of the GUI"
+    )
+    actions = parser.add_mutually_exclusive_group()
+    actions.add_argument(
+        '--quick',
+        action='store_true',
+        help="run a quick removal in the terminal and exit"
+    )
+    actions.add_argument(
+        '--complete',
+        action='store_true',
+        help="run a complete removal in the terminal and exit"
+    )
+    actions.add_argument(
+        '--ultimate',
+        action='store_true',
+        help="run an ultimate removal, including the Machine ID reset, in the terminal and exit"
+    )
+    actions.add_argument(
+        '--backup',
+        action='store_true',
+        help="create a backup without removing anything and exit"
+    )
+    parser.add_argument(
+        '--backup-mode',
+        choices=BACKUP_MODES,
+        default='full',
+        help="full: copy files into the backup folder; "
+             "store: deduplicate files into the shared object store; "
+             "incremental: hard-link files unchanged since the previous backup; "
+             "archive: stream everything into a single compressed archive; "
+             "snapshot: reflink or hard-link files when the backup is on the same volume"
+    )
+    parser.add_argument(
+        '--archive',
+        dest='backup_mode',
+        action='store_const',
+        const='archive',
+        help="shortcut for --backup-mode archive"
+    )
+    parser.add_argument(
+        '--lean-extensions',
+        action='store_true',
+        help="record extension ids, versions and metadata and back up only user-modified "
+             "extension files instead of the full re-downloadable payload"
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=[],
+        metavar='PATTERN',
+        help="leave matching files and folders out of the backup (glob; repeatable). "
+             "Patterns without a slash match names at any depth"
+    )
+    parser.add_argument(
+        '--include',
+        action='append',
+        default=[],
+        metavar='PATTERN',
+        help="back up matching entries even if an exclude rule or the size limit matches"
+    )
+    parser.add_argument(
+        '--max-file-size',
+        type=float,
+        metavar='MB',
+        help="leave files larger than this out of the backup"
+    )
+    parser.add_argument(
+        '--no-default-excludes',
+        action='store_true',
+        help="also back up caches, logs and crash dumps VSCode regenerates"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_COPY_WORKERS,
+        help=f"number of parallel file copy threads (default: {DEFAULT_COPY_WORKERS})"
+    )
+    parser.add_argument(
+        '--restore',
+        metavar='BACKUP_DIR',
+        nargs='?',
+        const='latest',
+        help="restore a backup (default: the latest one) and exit; "
+             "an interrupted restore resumes where it stopped"
+    )
+    parser.add_argument(
+        '--full-restore',
+        action='store_true',
+        help="with --restore, copy every file back even if it is already identical on disk"
+    )
+    parser.add_argument(
+        '--restore-file',
+        metavar='PATTERN',
+        help="with --restore, restore only matching files: a backup path, a folder "
+             "inside the backup, or a glob such as settings.json"
+    )
+    parser.add_argument(
+        '--restore-to',
+        metavar='DIR',
+        help="with --restore-file, write the files below DIR instead of their original locations"
+    )
+    parser.add_argument(
+        '--verify',
+        metavar='BACKUP_DIR',
+        nargs='?',
+        const='latest',
+        help="verify a backup (default: the latest one) against its file manifest and exit"
+    )
+    parser.add_argument(
+        '--sample',
+        type=float,
+        metavar='FRACTION',
+        help=f"with --verify, check a random fraction of files (at least {VERIFY_MIN_SAMPLE}) "
+             "instead of every file"
+    )
+    parser.add_argument(
+        '--products',
+        metavar='PRODUCT',
+        nargs='+',
+        choices=list(PRODUCT_PROFILES) + ['all'],
+        default=list(DEFAULT_PRODUCTS),
+        help=f"products to discover, back up and remove (default: {' '.join(DEFAULT_PRODUCTS)}; "
+             f"available: {', '.join(PRODUCT_PROFILES)} or all)"
+    )
+    parser.add_argument(
+        '--sweep-users',
+        metavar='USERS_ROOT',
+        nargs='?',
+        const=DEFAULT_USERS_ROOT,
+        help=f"analyze every user profile under USERS_ROOT (default: {DEFAULT_USERS_ROOT}) "
+             "concurrently and exit"
+    )
+    parser.add_argument(
+        '--sweep-remove',
+        choices=('basic', 'complete', 'ultimate'),
+        help="with --sweep-users, also remove each profile's VSCode folders in this mode (asks for confirmation)"
+    )
+    parser.add_argument(
+        '--yes',
+        action='store_true',
+        help="with --sweep-remove, remove other users' data without asking for confirmation"
+    )
+    parser.add_argument(
+        '--reclaim-extensions',
+        action='store_true',
+        help="delete superseded and obsolete extension versions, keeping installed ones, and exit"
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help="with --reclaim-extensions, only report what would be reclaimed"
+    )
+    parser.add_argument(
+        '--analyze',
+        action='store_true',
+        help="print the system analysis, including disk footprint per category, and exit"
+    )
+    parser.add_argument(
+        '--ndjson',
+        metavar='FILE',
+        help="with --analyze, stream the analysis to FILE (- for standard output) as NDJSON records "
+             "instead of printing it"
+    )
+    parser.add_argument(
+        '--top',
+        metavar='N',
+        type=int,
+        nargs='?',
+        const=TOP_CONSUMERS,
+        help=f"with --analyze, also report the N largest folders and files "
+             f"of each user data folder (default: {TOP_CONSUMERS})"
+    )
+    parser.add_argument(
+        '--rescan',
+        action='store_true',
+        help="with --analyze, list every directory again without reading or updating the footprint cache"
+    )
+    parser.add_argument(
+        '--no-background-purge',
+        action='store_true',
+        help="delete removed folders before moving on instead of renaming them aside and purging them in the background"
+    )
+    parser.add_argument(
+        '--purge-tombstones',
+        action='store_true',
+        help="purge folders an interrupted run renamed aside but did not finish deleting, and exit"
+    )
+    return parser.parse_args(argv)
 
 def main():
     """Main entry point"""
+    global GUI_AVAILABLE
+    args = parse_arguments()
+    
     # Check Python version
     if sys.version_info < (3, 6):
         print("Python 3.6 or later is required!")
@@ -1944,8 +5171,91 @@ def main():
         print("This tool is designed for Windows only!")
         sys.exit(1)
     
+    # Actions started from the command line report to the terminal
+    removal = {'quick': args.quick, 'complete': args.complete, 'ultimate': args.ultimate}
+    if args.console or args.backup or any(removal.values()):
+        GUI_AVAILABLE = False
+    # Records own standard output; messages meant for people go to stderr
+    records_out = sys.stdout
+    if args.analyze and args.ndjson == '-':
+        sys.stdout = sys.stderr
+    
     try:
-        app = VSCodeRemovalTool()
+        app = VSCodeRemovalTool(
+            backup_mode=args.backup_mode,
+            copy_workers=args.workers,
+            lean_extensions=args.lean_extensions,
+            backup_rules=PathRules(
+                ([] if args.no_default_excludes else DEFAULT_BACKUP_EXCLUDES) + args.exclude,
+                keep=args.include,
+                max_file_size=int(args.max_file_size * 1024 * 1024) if args.max_file_size else None
+            ),
+            products=list(PRODUCT_PROFILES) if 'all' in args.products else args.products,
+            background_purge=not args.no_background_purge
+        )
+        if args.restore:
+            backups = app._list_backups()
+            backup_dir = Path(args.restore) if args.restore != 'latest' else (backups[-1] if backups else None)
+            if backup_dir is None:
+                print("No backups found.")
+                sys.exit(1)
+            if args.restore_file:
+                target_dir = Path(args.restore_to) if args.restore_to else None
+                sys.exit(0 if app.restore_files(backup_dir, args.restore_file, target_dir,
+                                                delta=not args.full_restore) else 2)
+            sys.exit(0 if app.restore_from_backup(backup_dir, delta=not args.full_restore) else 2)
+        if args.verify:
+            backup_dir = None if args.verify == 'latest' else Path(args.verify)
+            if backup_dir is None:
+                latest = app._get_catalog().latest()
+                backup_dir = Path(latest['path']) if latest else app.backup_dir
+            sys.exit(0 if app.verify_backup(backup_dir, sample=args.sample) else 2)
+        if args.reclaim_extensions:
+            stats = app.reclaim_obsolete_extensions(dry_run=args.dry_run)
+            sys.exit(0 if not stats['errors'] else 2)
+        if args.sweep_users:
+            confirmed = args.yes
+            if args.sweep_remove and not confirmed:
+                answer = input(f"Remove VSCode data ({args.sweep_remove} mode) of every user profile under "
+                               f"{args.sweep_users} without a backup? Type YES to continue: ")
+                confirmed = answer.strip() == "YES"
+                if not confirmed:
+                    print("Sweep cancelled.")
+                    sys.exit(1)
+            profile_stats = app.sweep_user_profiles(args.sweep_users, remove_mode=args.sweep_remove,
+                                                    confirmed=confirmed)
+            for name, stats in sorted(profile_stats.items()):
+                print(f"{name:<24} {stats.get('bytes', 0) / (1024 * 1024):>10.1f} MB "
+                      f"{stats.get('files', 0):>9} files  {','.join(stats.get('products', [])) or '-'}"
+                      + (f"  {stats.get('directories_removed', 0)} directories removed" if args.sweep_remove else ""))
+                for error in stats['errors']:
+                    print(f"    ⚠️ {error}")
+            app._finish_background_purge()
+            sys.exit(0 if not any(stats['errors'] for stats in profile_stats.values()) else 2)
+        if args.purge_tombstones:
+            purger = app._get_purger()
+            purger.wait()
+            status = purger.status()
+            print(f"Purged {status['purged']} tombstones ({status['files']} files, "
+                  f"{status['bytes'] / (1024 * 1024):.1f} MB)")
+            sys.exit(0 if not status['errors'] else 2)
+        if args.analyze:
+            if args.ndjson:
+                # Line buffering hands every record to the collector as soon as it is written
+                target = records_out.fileno() if args.ndjson == '-' else args.ndjson
+                with open(target, 'w', encoding='utf-8', buffering=1, closefd=args.ndjson != '-') as out:
+                    app.stream_analysis(out, use_cache=not args.rescan, top=args.top)
+            else:
+                app._console_system_analysis(use_cache=not args.rescan, top=args.top)
+            sys.exit(0)
+        if args.backup:
+            app.backup_only()
+            sys.exit(0 if app.backup_created else 2)
+        for mode, selected in removal.items():
+            if selected:
+                getattr(app, f"{mode}_removal")()
+                app._finish_background_purge()
+                sys.exit(0)
         app.run()
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
@@ -0,0 +1,54 @@
+"""Shared fixtures: a synthetic Windows-like user profile and a tool bound to it"""
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import seylabicode  # noqa: E402
+
+
+def write(path: Path, content="x") -> Path:
+    """Create a file and its parent folders"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content, encoding='utf-8')
+    return path
+
+
+def make_profile(home: Path) -> dict:
+    """Create the per-user folders of a profile and return its environment"""
+    environment = seylabicode.user_profile_environment(home)
+    for folder in ('APPDATA', 'LOCALAPPDATA', 'TEMP'):
+        Path(environment[folder]).mkdir(parents=True, exist_ok=True)
+    return environment
+
+
+@pytest.fixture
+def profile(tmp_path):
+    """Environment of a single synthetic user profile"""
+    return make_profile(tmp_path / "Users" / "alice")
+
+
+@pytest.fixture
+def make_tool(tmp_path, monkeypatch, profile):
+    """Build tools without GUI, prompts, or writes outside tmp_path"""
+    home = tmp_path / "home"
+    (home / "Desktop").mkdir(parents=True)
+    (tmp_path / "tmp").mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.setenv('USERPROFILE', str(home))
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / "tmp"))
+    monkeypatch.setattr(seylabicode, 'GUI_AVAILABLE', False)
+    monkeypatch.setattr('builtins.input', lambda prompt="": "")
+    
+    def make(**kwargs):
+        kwargs.setdefault('environment', profile)
+        kwargs.setdefault('products', ['vscode'])
+        return seylabicode.VSCodeRemovalTool(**kwargs)
+    
+    return make
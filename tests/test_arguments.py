@@ -0,0 +1,25 @@
+"""Command line parsing"""
+import pytest
+
+import seylabicode
+
+
+@pytest.mark.parametrize('flag', ['--console', '--quick', '--complete', '--ultimate', '--backup', '--analyze'])
+def test_documented_flags_are_accepted(flag):
+    args = seylabicode.parse_arguments([flag])
+    assert getattr(args, flag[2:])
+
+
+def test_backup_is_not_taken_for_backup_mode():
+    args = seylabicode.parse_arguments(['--backup'])
+    assert args.backup and args.backup_mode == 'full'
+
+
+def test_abbreviations_are_rejected():
+    with pytest.raises(SystemExit):
+        seylabicode.parse_arguments(['--back'])
+
+
+def test_removal_modes_are_exclusive():
+    with pytest.raises(SystemExit):
+        seylabicode.parse_arguments(['--quick', '--ultimate'])
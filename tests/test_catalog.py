@@ -0,0 +1,58 @@
+"""SQLite backup catalog"""
+import shutil
+
+import seylabicode
+
+
+def test_latest_skips_backups_without_a_file_manifest(tmp_path):
+    catalog = seylabicode.BackupCatalog(tmp_path / "catalog.db")
+    catalog.record_backup("a", tmp_path / "a", "2026-01-01T00:00:00", "full", 10, 2, [])
+    catalog.record_backup("b", tmp_path / "b", "2026-01-02T00:00:00", "full", None, None, [])
+    
+    assert catalog.latest()['session_id'] == "a"
+    assert catalog.latest(exclude=tmp_path / "a") is None
+    assert [record['session_id'] for record in catalog.list_backups(newest_first=True)] == ["b", "a"]
+
+
+def test_catalog_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    connect = seylabicode.sqlite3.connect
+    
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+    
+    monkeypatch.setattr(seylabicode.sqlite3, 'connect', tracking_connect)
+    catalog = seylabicode.BackupCatalog(tmp_path / "catalog.db")
+    catalog.record_backup("a", tmp_path / "a", "2026-01-01T00:00:00", "full", 10, 2, [])
+    catalog.list_backups()
+    
+    for conn in opened:
+        try:
+            conn.execute("SELECT 1")
+        except seylabicode.sqlite3.ProgrammingError:
+            continue
+        raise AssertionError("connection left open")
+
+
+def test_missing_backups_are_listed_until_selected(make_tool):
+    tool = make_tool()
+    tool.create_advanced_backup()
+    shutil.rmtree(tool.backup_dir)
+    
+    assert [record['path'] for record in tool._list_backup_records()] == [str(tool.backup_dir)]
+    assert not tool.restore_from_backup(tool.backup_dir)
+    assert tool._list_backup_records() == []
+
+
+def test_backup_without_files_has_no_file_count(make_tool):
+    tool = make_tool()
+    tool.create_advanced_backup()
+    record = tool._get_catalog().list_backups()[0]
+    assert record['file_count'] is not None
+    
+    tool._file_manifest = {}
+    tool._record_in_catalog()
+    record = tool._get_catalog().list_backups()[0]
+    assert (record['file_count'], record['total_bytes']) == (None, None)
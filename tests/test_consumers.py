@@ -0,0 +1,38 @@
+"""Largest-consumer reports fed by the footprint walk"""
+from pathlib import Path
+
+import seylabicode
+from conftest import write
+
+
+def test_consumers_come_from_the_footprint_walk(make_tool, profile, monkeypatch):
+    user_data = Path(profile['APPDATA']) / "Code"
+    write(user_data / "User" / "workspaceStorage" / "abc" / "state.vscdb", "w" * 300)
+    write(user_data / "User" / "settings.json", "s" * 20)
+    write(user_data / "CachedData" / "build" / "chunk.bin", "c" * 500)
+    write(user_data / "logs" / "main.log", "l" * 5)
+    home = Path(profile['USERPROFILE'])
+    write(home / ".vscode" / "extensions" / "ms-python.python-1.0.0" / "dist" / "bundle.js", "e" * 1000)
+    tool = make_tool()
+    
+    listed = []
+    scandir = seylabicode.os.scandir
+    monkeypatch.setattr(seylabicode.os, 'scandir', lambda path: listed.append(str(path)) or scandir(path))
+    reports = {report['root']: report for report in tool.largest_consumers(top=3, use_cache=False)}
+    
+    walked = [path for path in listed if str(user_data) in path]
+    assert len(walked) == len(set(walked))
+    
+    report = reports[str(user_data)]
+    assert (report['bytes'], report['files'], report['product']) == (825, 4, 'vscode')
+    assert report['subtrees'] == [
+        (str(user_data / "CachedData"), 500),
+        (str(user_data / "CachedData" / "build"), 500),
+        (str(user_data / "User"), 320)
+    ]
+    assert report['largest_files'][0] == (str(user_data / "CachedData" / "build" / "chunk.bin"), 500)
+    assert len(report['largest_files']) == 3
+    
+    report = reports[str(home / ".vscode")]
+    assert report['bytes'] == 1000
+    assert report['subtrees'][0] == (str(home / ".vscode" / "extensions"), 1000)
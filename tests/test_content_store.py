@@ -0,0 +1,56 @@
+"""Content-addressed store and store-mode backups"""
+import builtins
+import json
+from pathlib import Path
+
+import seylabicode
+from conftest import write
+
+
+def test_put_file_deduplicates_identical_content(tmp_path):
+    store = seylabicode.ContentStore(tmp_path / "store")
+    first = write(tmp_path / "a.txt", "same")
+    second = write(tmp_path / "b.txt", "same")
+    
+    digest, size, written = store.put_file(first)
+    assert (size, written) == (4, True)
+    assert store.put_file(second) == (digest, 4, False)
+    assert store.object_path(digest).read_text() == "same"
+    assert not list(store.tmp_dir.iterdir())
+
+
+def test_put_file_reads_the_source_once(tmp_path, monkeypatch):
+    store = seylabicode.ContentStore(tmp_path / "store")
+    source = write(tmp_path / "a.txt", "content")
+    reads = []
+    
+    def counting_open(file, mode='r', *args, **kwargs):
+        if Path(file) == source:
+            reads.append(mode)
+        return builtins.open(file, mode, *args, **kwargs)
+    
+    monkeypatch.setattr(seylabicode, 'open', counting_open, raising=False)
+    store.put_file(source)
+    assert reads == ['rb']
+
+
+def test_store_backup_skips_files_unchanged_since_last_session(make_tool, profile, monkeypatch):
+    user = Path(profile['APPDATA']) / "Code" / "User"
+    write(user / "settings.json", '{"a": 1}')
+    changed = write(user / "keybindings.json", "[]")
+    
+    make_tool(backup_mode="store").create_advanced_backup()
+    write(changed, '[{"key": "ctrl+k"}]')
+    
+    stored = []
+    put_file = seylabicode.ContentStore.put_file
+    monkeypatch.setattr(seylabicode.ContentStore, 'put_file',
+                        lambda self, src: stored.append(Path(src).name) or put_file(self, src))
+    tool = make_tool(backup_mode="store")
+    tool.create_advanced_backup()
+    
+    assert stored == ["keybindings.json"]
+    with open(tool.backup_dir / "file_manifest.json") as f:
+        files = json.load(f)['files']
+    assert files["Settings/Code/settings.json"]['stored']
+    assert files["Settings/Code/keybindings.json"]['size'] == changed.stat().st_size
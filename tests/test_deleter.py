@@ -0,0 +1,99 @@
+"""Parallel tree deletion"""
+import os
+
+import pytest
+
+import seylabicode
+from conftest import write
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "Code"
+    write(root / "User" / "settings.json", "a" * 10)
+    write(root / "User" / "snippets" / "python.json", "b" * 20)
+    write(root / "logs" / "main.log", "c" * 30)
+    (root / "empty").mkdir()
+    return root
+
+
+def test_counts_every_file_byte_and_directory(tree):
+    stats = seylabicode.ParallelTreeDeleter(4).delete(tree)
+    
+    assert not tree.exists()
+    assert not stats['errors']
+    assert (stats['files'], stats['bytes'], stats['directories']) == (3, 60, 5)
+
+
+def test_directories_holding_undeletable_files_are_left(tree, monkeypatch):
+    locked = str(tree / "User" / "snippets" / "python.json")
+    unlink = os.unlink
+    
+    def refuse(path, *args, **kwargs):
+        if str(path) == locked:
+            raise PermissionError(13, "Permission denied", str(path))
+        unlink(path, *args, **kwargs)
+    
+    monkeypatch.setattr(seylabicode.os, 'unlink', refuse)
+    stats = seylabicode.ParallelTreeDeleter(4).delete(tree)
+    
+    assert [path for path, _ in stats['errors']] == [locked]
+    assert (stats['files'], stats['bytes']) == (2, 40)
+    assert sorted(str(p.relative_to(tree)) for p in tree.rglob("*")) == [
+        "User", os.path.join("User", "snippets"), os.path.join("User", "snippets", "python.json")
+    ]
+
+
+def test_links_are_removed_without_following_them(tree, tmp_path):
+    outside = tmp_path / "Projects"
+    write(outside / "main.py", "print()")
+    try:
+        os.symlink(outside, tree / "projects", target_is_directory=True)
+        os.symlink(outside / "main.py", tree / "main.py")
+    except (OSError, NotImplementedError):
+        pytest.skip("symbolic links are not available")
+    
+    stats = seylabicode.ParallelTreeDeleter(4).delete(tree)
+    
+    assert not tree.exists() and not stats['errors']
+    assert (outside / "main.py").read_text() == "print()"
+    assert stats['files'] == 5
+
+
+def test_linked_root_is_removed_but_not_its_target(tmp_path):
+    outside = tmp_path / "Projects"
+    write(outside / "main.py", "print()")
+    link = tmp_path / "Code"
+    try:
+        os.symlink(outside, link, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("symbolic links are not available")
+    
+    stats = seylabicode.ParallelTreeDeleter(2).delete(link)
+    
+    assert not os.path.lexists(link) and not stats['errors']
+    assert (outside / "main.py").exists()
+
+
+def test_read_only_files_are_retried_after_clearing_the_attribute(tree, monkeypatch):
+    read_only = str(tree / "logs" / "main.log")
+    unlink = os.unlink
+    chmod = os.chmod
+    cleared = []
+    
+    def unlink_unless_read_only(path, *args, **kwargs):
+        if str(path) == read_only and not cleared:
+            raise PermissionError(13, "Access is denied", str(path))
+        unlink(path, *args, **kwargs)
+    
+    def record_chmod(path, mode, *args, **kwargs):
+        cleared.append(str(path))
+        chmod(path, mode, *args, **kwargs)
+    
+    monkeypatch.setattr(seylabicode.os, 'unlink', unlink_unless_read_only)
+    monkeypatch.setattr(seylabicode.os, 'chmod', record_chmod)
+    stats = seylabicode.ParallelTreeDeleter(4).delete(tree)
+    
+    assert cleared == [read_only]
+    assert not tree.exists() and not stats['errors']
+    assert (stats['files'], stats['bytes']) == (3, 60)
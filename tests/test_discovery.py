@@ -0,0 +1,102 @@
+"""Product discovery and the Temp signature sweep"""
+from pathlib import Path
+
+import pytest
+
+import seylabicode
+from conftest import write
+
+
+def test_temp_is_never_a_removal_target(profile):
+    temp = Path(profile['TEMP'])
+    (Path(profile['APPDATA']) / "Code").mkdir()
+    (Path(profile['LOCALAPPDATA']) / "Microsoft" / "VSCode").mkdir(parents=True)
+    paths = seylabicode.PathDiscovery(['vscode'], profile)
+    
+    for mode in ("basic", "complete", "ultimate"):
+        targets = paths.removal_targets(mode)
+        assert targets
+        assert not any(target == temp or target in temp.parents for target in targets)
+
+
+def test_system_cleanup_only_removes_signature_entries(make_tool, profile, monkeypatch):
+    temp = Path(profile['TEMP'])
+    write(temp / "vscode-inno-updater-1.log")
+    write(temp / "vscode" / "state.txt")
+    write(temp / "vscode-ipc-1234.sock")
+    write(temp / "barcode" / "data.txt")
+    write(temp / "data.txt")
+    tool = make_tool()
+    monkeypatch.setattr(tool, '_running_product_processes', lambda: [])
+    
+    tool.perform_system_cleanup()
+    
+    assert sorted(p.name for p in temp.iterdir()) == ["barcode", "data.txt"]
+
+
+@pytest.mark.parametrize("running", [["Code.exe"], None])
+def test_system_cleanup_keeps_live_sockets(make_tool, profile, monkeypatch, running):
+    temp = Path(profile['TEMP'])
+    write(temp / "vscode-ipc-1234.sock")
+    write(temp / "vscode-git-5678.sock")
+    write(temp / "vscode-typescript1000" / "tsserver.log")
+    tool = make_tool()
+    monkeypatch.setattr(tool, '_running_product_processes', lambda: running)
+    
+    tool.perform_system_cleanup()
+    
+    assert sorted(p.name for p in temp.iterdir()) == ["vscode-git-5678.sock", "vscode-ipc-1234.sock"]
+
+
+def test_footprint_caches_count_only_signature_entries(profile):
+    temp = Path(profile['TEMP'])
+    write(temp / "vscode-typescript1000" / "tsserver.log", "a" * 100)
+    write(temp / "vscode-inno-updater-1.log", "b" * 10)
+    write(temp / "unrelated" / "big.bin", "c" * 10000)
+    write(temp / "data.txt", "d" * 1000)
+    paths = seylabicode.PathDiscovery(['vscode'], profile)
+    
+    caches = seylabicode.FootprintScanner(2).scan(paths.footprint_roots())['categories']['caches']
+    
+    assert (caches['files'], caches['bytes']) == (2, 110)
+
+
+def test_discovery_is_lazy_and_cached_until_invalidated(profile, monkeypatch):
+    calls = []
+    match = seylabicode.match_product_paths
+    monkeypatch.setattr(seylabicode, 'match_product_paths', lambda *args: calls.append(args) or match(*args))
+    paths = seylabicode.PathDiscovery(['vscode'], profile)
+    assert not calls
+    
+    assert paths['user_data_paths'] == []
+    code = Path(profile['APPDATA']) / "Code"
+    code.mkdir()
+    assert paths['user_data_paths'] == []
+    assert len(calls) == 1
+    
+    paths.invalidate()
+    assert paths['user_data_paths'] == [code]
+
+
+def test_removal_invalidates_discovered_paths(make_tool, profile):
+    code = Path(profile['APPDATA']) / "Code"
+    write(code / "User" / "settings.json", "{}")
+    tool = make_tool(background_purge=False)
+    assert tool.vscode_paths['user_data_paths'] == [code]
+    
+    tool.remove_directories("basic")
+    
+    assert not code.exists()
+    assert tool.vscode_paths['user_data_paths'] == []
+
+
+def test_machine_id_cleanup_invalidates_workspace_storage(make_tool, profile):
+    storage = Path(profile['APPDATA']) / "Code" / "User" / "workspaceStorage"
+    write(storage / "abc" / "state.vscdb", b"state")
+    tool = make_tool(background_purge=False)
+    assert tool.vscode_paths['workspace_storage_paths'] == [storage]
+    
+    tool._clear_machine_id_files()
+    
+    assert not storage.exists()
+    assert tool.vscode_paths['workspace_storage_paths'] == []
@@ -0,0 +1,64 @@
+"""Reclaiming superseded and obsolete extension versions"""
+import json
+from pathlib import Path
+
+import pytest
+
+import seylabicode
+from conftest import write
+
+
+@pytest.fixture
+def ext_path(profile):
+    path = Path(profile['USERPROFILE']) / ".vscode" / "extensions"
+    for name in ("ms-vscode.cpptools-1.20.5-win32-x64", "ms-vscode.cpptools-1.20.5-universal",
+                 "ms-vscode.cpptools-1.19.0-win32-x64", "ms-python.python-2024.2.0",
+                 "ms-python.python-2024.10.0"):
+        write(path / name / "package.json", "{}")
+    return path
+
+
+def test_newest_version_keeps_every_platform_variant(ext_path):
+    obsolete = sorted(folder.name for folder, _ in seylabicode.find_obsolete_extensions(ext_path))
+    
+    assert obsolete == ["ms-python.python-2024.2.0", "ms-vscode.cpptools-1.19.0-win32-x64"]
+
+
+def test_extensions_json_decides_what_is_installed(ext_path):
+    write(ext_path / "extensions.json", json.dumps([{'relativeLocation': "ms-python.python-2024.2.0"}]))
+    write(ext_path / ".obsolete", json.dumps({"ms-vscode.cpptools-1.20.5-universal": True}))
+    
+    obsolete = dict((folder.name, reason) for folder, reason in seylabicode.find_obsolete_extensions(ext_path))
+    
+    assert obsolete == {
+        "ms-python.python-2024.10.0": "superseded by ms-python.python-2024.2.0",
+        "ms-vscode.cpptools-1.20.5-universal": "marked obsolete"
+    }
+
+
+def test_reclaim_refuses_while_vscode_runs(make_tool, ext_path, monkeypatch):
+    tool = make_tool(background_purge=False)
+    monkeypatch.setattr(tool, '_running_product_processes', lambda: ["Code.exe"])
+    
+    stats = tool.reclaim_obsolete_extensions()
+    
+    assert stats['extensions_removed'] == 0 and stats['errors']
+    assert (ext_path / "ms-python.python-2024.2.0").is_dir()
+    
+    monkeypatch.setattr(tool, '_running_product_processes', lambda: [])
+    stats = tool.reclaim_obsolete_extensions()
+    
+    assert stats['extensions_removed'] == 2 and not stats['errors']
+    assert sorted(p.name for p in ext_path.iterdir()) == [
+        "ms-python.python-2024.10.0", "ms-vscode.cpptools-1.20.5-universal", "ms-vscode.cpptools-1.20.5-win32-x64"
+    ]
+
+
+def test_dry_run_does_not_need_vscode_closed(make_tool, ext_path, monkeypatch):
+    tool = make_tool()
+    monkeypatch.setattr(tool, '_running_product_processes', lambda: None)
+    
+    stats = tool.reclaim_obsolete_extensions(dry_run=True)
+    
+    assert stats['extensions_removed'] == 2
+    assert (ext_path / "ms-python.python-2024.2.0").is_dir()
@@ -0,0 +1,138 @@
+"""Footprint scanner and its per-directory cache"""
+import json
+import os
+import time
+
+import seylabicode
+from conftest import write
+
+
+def scan(root, db_path):
+    cache = seylabicode.FootprintCache(db_path)
+    try:
+        result = seylabicode.FootprintScanner(2, cache).scan({'user_data': [root]})
+        cache.prune()
+    finally:
+        cache.close()
+    return result
+
+
+def age(root, seconds=60):
+    """Move every mtime back so the listings are outside the racy window"""
+    past = time.time() - seconds
+    for directory, _, files in os.walk(root):
+        for name in files:
+            os.utime(os.path.join(directory, name), (past, past))
+        os.utime(directory, (past, past))
+
+
+def test_cache_serves_unchanged_directories_without_stat_calls(tmp_path, monkeypatch):
+    root = tmp_path / "Code"
+    files = {str(write(root / "logs" / "main.log", "a" * 10)), str(write(root / "User" / "settings.json", "{}"))}
+    age(root)
+    first = scan(root, tmp_path / "cache.db")
+    assert first['total_bytes'] == 12
+    
+    stat = os.stat
+    stated = []
+    monkeypatch.setattr(seylabicode.os, 'stat', lambda path, **kwargs: stated.append(str(path)) or stat(path, **kwargs))
+    second = scan(root, tmp_path / "cache.db")
+    monkeypatch.undo()
+    
+    assert stated and not files & set(stated)
+    assert second['cached_directories'] == first['categories']['user_data']['directories']
+    assert (second['total_files'], second['total_bytes']) == (2, 12)
+
+
+def test_files_grown_in_place_count_once_their_directory_changes(tmp_path):
+    root = tmp_path / "Code"
+    log = write(root / "logs" / "main.log", "a" * 10)
+    age(root)
+    scan(root, tmp_path / "cache.db")
+    
+    # Appending leaves the directory's mtime alone, so the record still stands
+    directory_mtime = os.stat(log.parent).st_mtime_ns
+    with open(log, 'a', encoding='utf-8') as f:
+        f.write("b" * 90)
+    os.utime(log.parent, ns=(directory_mtime, directory_mtime))
+    assert scan(root, tmp_path / "cache.db")['total_bytes'] == 10
+    
+    write(log.parent / "renderer.log", "c")
+    result = scan(root, tmp_path / "cache.db")
+    
+    assert (result['total_files'], result['total_bytes']) == (2, 101)
+
+
+def test_cache_keeps_the_largest_files_of_unchanged_directories(tmp_path):
+    root = tmp_path / "Code"
+    for i in range(1, 4):
+        write(root / f"{i}.bin", "x" * i)
+    age(root)
+    db_path = tmp_path / "cache.db"
+    scan(root, db_path)
+    
+    cache = seylabicode.FootprintCache(db_path)
+    consumers = seylabicode.LargestConsumers([root], top=2)
+    try:
+        result = seylabicode.FootprintScanner(2, cache).scan({'user_data': [root]}, consumers=consumers)
+    finally:
+        cache.close()
+    
+    assert result['cached_directories'] == 1
+    assert [name for name, _ in consumers.reports()[0]['largest_files']] == [str(root / "3.bin"), str(root / "2.bin")]
+
+
+def test_cache_forgets_directories_that_are_gone(tmp_path):
+    root = tmp_path / "Code"
+    write(root / "a" / "one.txt")
+    write(root / "b" / "two.txt")
+    age(root)
+    scan(root, tmp_path / "cache.db")
+    
+    cache = seylabicode.FootprintCache(tmp_path / "cache.db")
+    assert cache.get(str(root / "a")) is not None
+    cache.close()
+    
+    for name in ("two.txt", ""):
+        (root / "b" / name).unlink() if name else (root / "b").rmdir()
+    scan(root, tmp_path / "cache.db")
+    
+    cache = seylabicode.FootprintCache(tmp_path / "cache.db")
+    assert cache.get(str(root / "b")) is None
+    assert cache.get(str(root / "a")) is not None
+    cache.close()
+
+
+def test_large_unchanged_trees_are_handed_back_in_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(seylabicode, 'FOOTPRINT_TASK_DIRECTORIES', 2)
+    root = tmp_path / "Code"
+    for i in range(5):
+        write(root / f"d{i}" / "sub" / "f.txt", "x" * i)
+    age(root)
+    scan(root, tmp_path / "cache.db")
+    
+    result = scan(root, tmp_path / "cache.db")
+    
+    assert result['cached_directories'] == 11
+    assert (result['total_files'], result['total_bytes']) == (5, 10)
+
+
+def test_ndjson_can_stream_to_stdout(make_tool, profile, monkeypatch, capfd):
+    write(seylabicode.Path(profile['APPDATA']) / "Code" / "User" / "settings.json", "{}")
+    # main() points sys.stdout at stderr; restore it afterwards
+    monkeypatch.setattr(seylabicode.sys, 'stdout', seylabicode.sys.stdout)
+    monkeypatch.setattr(seylabicode.sys, 'argv', ["seylabicode.py", "--analyze", "--ndjson", "-"])
+    monkeypatch.setattr(seylabicode.sys, 'platform', 'win32')
+    tool = make_tool()
+    monkeypatch.setattr(seylabicode, 'VSCodeRemovalTool', lambda **kwargs: tool)
+    capfd.readouterr()
+    
+    try:
+        seylabicode.main()
+    except SystemExit:
+        pass
+    
+    out = capfd.readouterr().out
+    records = [json.loads(line) for line in out.splitlines()]
+    assert records[0]['type'] == 'session'
+    assert records[-1]['type'] == 'summary'
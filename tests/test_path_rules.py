@@ -0,0 +1,71 @@
+"""Compiled include/exclude rules and the walks that use them"""
+import seylabicode
+from seylabicode import PathRules, find_matches, scan_tree
+from conftest import write
+
+
+def walk(root, rules):
+    return sorted(relative for _, relative in scan_tree(root, rules))
+
+
+def test_name_and_anchored_patterns_are_case_insensitive():
+    rules = PathRules(['cacheddata', '*.LOG', 'User/workspaceStorage'])
+    assert rules.matches("a/CachedData", "CachedData", True)
+    assert rules.matches("logs/main.log", "main.log", False)
+    assert rules.matches("user/WorkspaceStorage", "WorkspaceStorage", True)
+    assert not rules.matches("other/User/workspaceStorage", "workspaceStorage", True)
+
+
+def test_keep_patterns_and_size_limit():
+    rules = PathRules(['*.log'], keep=['important.log'], max_file_size=10)
+    assert not rules.matches("important.log", "important.log", False)
+    assert rules.matches("big.bin", "big.bin", False, size=11)
+    assert not rules.matches("big", "big", True, size=11)
+
+
+def test_trailing_slash_only_matches_directories():
+    rules = PathRules(seylabicode.LEAN_SKIP_DIRS)
+    assert rules.matches("dist", "dist", True)
+    assert not rules.matches("bin", "bin", False)
+
+
+def test_scan_tree_prunes_excluded_folders(tmp_path):
+    write(tmp_path / "User" / "settings.json")
+    write(tmp_path / "CachedData" / "abc" / "blob")
+    write(tmp_path / "logs" / "main.log")
+    assert walk(tmp_path, PathRules(['CachedData', '*.log'])) == ["User", "User/settings.json", "logs"]
+
+
+def test_include_inside_an_excluded_folder_is_kept(tmp_path):
+    write(tmp_path / "node_modules" / "lib" / "index.js")
+    write(tmp_path / "node_modules" / "lib" / "patched.json")
+    write(tmp_path / "src" / "patched.json")
+    rules = PathRules(['node_modules/'], keep=['node_modules/lib/patched.json'])
+    assert walk(tmp_path, rules) == ["node_modules", "node_modules/lib", "node_modules/lib/patched.json",
+                                     "src", "src/patched.json"]
+    
+    assert walk(tmp_path, PathRules(['node_modules/'], keep=['*.json'])) == [
+        "node_modules", "node_modules/lib", "node_modules/lib/patched.json", "src", "src/patched.json"]
+
+
+def test_telemetry_rules_only_match_the_telemetry_extensions(tmp_path):
+    storage = tmp_path / "User" / "globalStorage"
+    write(storage / "ms-vscode.vscode-telemetry" / "state")
+    write(storage / "vscode.vscode-telemetry" / "state")
+    write(storage / "acme.vscode-telemetry" / "state")
+    write(tmp_path / "CachedData" / "blob")
+    write(tmp_path / "User" / "CachedData" / "blob")
+    
+    matched = sorted(relative for _, relative in find_matches(tmp_path, seylabicode.TELEMETRY_RULES))
+    assert matched == ["CachedData", "User/globalStorage/ms-vscode.vscode-telemetry",
+                       "User/globalStorage/vscode.vscode-telemetry"]
+
+
+def test_find_matches_spares_kept_entries_inside_matched_folders(tmp_path):
+    write(tmp_path / "CrashDumps" / "a.dmp")
+    write(tmp_path / "CrashDumps" / "keep" / "notes.txt")
+    write(tmp_path / "CrashDumps" / "old" / "b.dmp")
+    rules = PathRules(['/CrashDumps'], keep=['CrashDumps/keep'])
+    
+    matched = sorted(relative for _, relative in find_matches(tmp_path, rules))
+    assert matched == ["CrashDumps/a.dmp", "CrashDumps/old"]
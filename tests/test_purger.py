@@ -0,0 +1,78 @@
+"""Background tombstone purging"""
+import json
+import threading
+from pathlib import Path
+
+import seylabicode
+from conftest import write
+
+
+def test_buried_folders_are_purged_and_the_journal_removed(tmp_path):
+    journal = tmp_path / "journal.json"
+    folder = tmp_path / "Code"
+    write(folder / "User" / "settings.json", "{}")
+    purger = seylabicode.TombstonePurger(journal)
+    
+    tombstone = purger.bury(folder)
+    assert tombstone is not None and not folder.exists()
+    assert purger.wait(timeout=10)
+    
+    assert not tombstone.exists()
+    assert purger.status()['purged'] == 1
+    assert not journal.exists()
+
+
+def test_tombstones_of_an_interrupted_run_are_resumed(tmp_path):
+    journal = tmp_path / "journal.json"
+    tombstone = tmp_path / f"{seylabicode.TOMBSTONE_PREFIX}abc"
+    write(tombstone / "file.txt")
+    gone = tmp_path / f"{seylabicode.TOMBSTONE_PREFIX}gone"
+    journal.write_text(json.dumps({
+        str(tombstone): {'original': str(tmp_path / "Code"), 'buried_at': 0},
+        str(gone): {'original': str(tmp_path / "Other"), 'buried_at': 0}
+    }), encoding='utf-8')
+    
+    purger = seylabicode.TombstonePurger(journal)
+    assert purger.resume() == 1
+    assert purger.wait(timeout=10)
+    assert not tombstone.exists() and not journal.exists()
+
+
+def test_concurrent_workers_share_one_purger(make_tool):
+    tool = make_tool()
+    purgers = []
+    barrier = threading.Barrier(8)
+    
+    def get():
+        barrier.wait()
+        purgers.append(tool._get_purger())
+    
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len({id(purger) for purger in purgers}) == 1
+
+
+def test_journal_is_kept_outside_temp(make_tool, profile):
+    tool = make_tool()
+    
+    journal = tool.tombstone_journal_path.resolve()
+    for folder in (seylabicode.tempfile.gettempdir(), profile['TEMP']):
+        assert Path(folder).resolve() not in journal.parents
+
+
+
+def test_journal_entries_that_are_not_tombstones_are_never_deleted(tmp_path):
+    journal = tmp_path / "journal.json"
+    documents = tmp_path / "Documents"
+    write(documents / "thesis.docx")
+    journal.write_text(json.dumps({str(documents): {'original': str(documents), 'buried_at': 0}}), encoding='utf-8')
+    
+    purger = seylabicode.TombstonePurger(journal)
+    assert purger.resume() == 0
+    
+    assert (documents / "thesis.docx").exists()
+    assert not journal.exists()
@@ -0,0 +1,84 @@
+"""Registry export through the snapshot backend"""
+import json
+
+import seylabicode
+
+HKCU = "HKEY_CURRENT_USER"
+SNAPSHOT = {
+    "HKEY_CURRENT_USER\\SOFTWARE\\Classes\\vscode": {
+        'values': [
+            {'name': "", 'type': seylabicode.REG_SZ, 'data': "URL:vscode"},
+            {'name': "Flags", 'type': seylabicode.REG_DWORD, 'data': 3},
+        ],
+        'subkeys': ["shell", "locked"]
+    },
+    "HKEY_CURRENT_USER\\SOFTWARE\\Classes\\vscode\\shell": {
+        'values': [{'name': "Blob", 'type': seylabicode.REG_BINARY, 'data': {'hex': "00ff"}}],
+        'subkeys': []
+    },
+}
+
+
+class LockedKeyBackend(seylabicode.SnapshotRegistryBackend):
+    """Snapshot backend that denies access to keys named 'locked'"""
+    
+    def read_key(self, hive, path):
+        if path.endswith("\\locked"):
+            raise PermissionError("Access is denied")
+        return super().read_key(hive, path)
+
+
+def test_export_renders_regedit_format():
+    exporter = seylabicode.RegistryExporter(seylabicode.SnapshotRegistryBackend(SNAPSHOT))
+    snapshot = exporter.export_key(HKCU, "SOFTWARE\\Classes\\vscode")
+    
+    assert list(snapshot) == ["HKEY_CURRENT_USER\\SOFTWARE\\Classes\\vscode",
+                              "HKEY_CURRENT_USER\\SOFTWARE\\Classes\\vscode\\shell"]
+    reg = seylabicode.RegistryExporter.to_reg(snapshot)
+    assert '@="URL:vscode"' in reg
+    assert '"Flags"=dword:00000003' in reg
+    assert '"Blob"=hex:00,ff' in reg
+
+
+def test_missing_keys_export_nothing():
+    exporter = seylabicode.RegistryExporter(seylabicode.SnapshotRegistryBackend(SNAPSHOT))
+    assert exporter.export_key(HKCU, "SOFTWARE\\Missing") == {}
+    assert exporter.unreadable == []
+
+
+def test_unreadable_subkey_is_skipped_and_recorded():
+    exporter = seylabicode.RegistryExporter(LockedKeyBackend(SNAPSHOT))
+    snapshot = exporter.export_key(HKCU, "SOFTWARE\\Classes\\vscode")
+    
+    assert len(snapshot) == 2
+    assert [key for key, _ in exporter.unreadable] == ["HKEY_CURRENT_USER\\SOFTWARE\\Classes\\vscode\\locked"]
+
+
+def test_snapshot_backend_replays_written_keys():
+    backend = seylabicode.SnapshotRegistryBackend({})
+    backend.write_key(HKCU, "SOFTWARE\\Test", [("Name", "value", seylabicode.REG_SZ)])
+    assert backend.read_key(HKCU, "SOFTWARE\\Test") == ([("Name", "value", seylabicode.REG_SZ)], [])
+
+
+def test_registry_exports_are_hashed_and_verified(make_tool):
+    tool = make_tool(registry_backend=LockedKeyBackend(SNAPSHOT))
+    tool.create_advanced_backup()
+    
+    with open(tool.backup_dir / "file_manifest.json") as f:
+        files = json.load(f)['files']
+    registry = sorted(relative for relative in files if relative.startswith("Registry/"))
+    assert registry == ["Registry/HKCU_SOFTWARE_Classes_vscode.reg", "Registry/registry_snapshot.json"]
+    assert all(seylabicode.HASH_ALGORITHM in files[relative] for relative in registry)
+    assert tool.verify_backup(tool.backup_dir)
+    
+    (tool.backup_dir / "Registry" / "registry_snapshot.json").write_text("{}")
+    assert not tool.verify_backup(tool.backup_dir)
+
+
+def test_registry_exports_in_archives_are_verified(make_tool):
+    tool = make_tool(backup_mode="archive", registry_backend=seylabicode.SnapshotRegistryBackend(SNAPSHOT))
+    tool.create_advanced_backup()
+    
+    reader = seylabicode.BackupReader(tool.backup_dir)
+    assert reader.files["Registry/registry_snapshot.json"]['archived']
+    assert tool.verify_backup(tool.backup_dir)
@@ -0,0 +1,148 @@
+"""Backup manifests and restores"""
+import json
+import os
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import seylabicode
+from conftest import write
+
+
+def make_backup_folder(backup_dir: Path, files: dict) -> Path:
+    """Write a full-mode backup folder with its per-file manifest"""
+    manifest = {}
+    for relative, content in files.items():
+        path = write(backup_dir / relative, content)
+        stat = path.stat()
+        manifest[relative] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    with open(backup_dir / "file_manifest.json", 'w') as f:
+        json.dump({'files': manifest}, f)
+    return backup_dir
+
+
+def test_restore_engine_resumes_from_its_journal(tmp_path):
+    backup_dir = make_backup_folder(tmp_path / "backup", {"Settings/a.json": "a", "Settings/b.json": "b"})
+    target = tmp_path / "target"
+    journal = write(tmp_path / "restore.journal", json.dumps("Settings/a.json") + "\n")
+    
+    engine = seylabicode.RestoreEngine(seylabicode.BackupReader(backup_dir),
+                                       lambda relative: target / relative, journal, workers=2)
+    stats = engine.run()
+    
+    assert (stats['files'], stats['resumed']) == (1, 1)
+    assert not (target / "Settings/a.json").exists()
+    assert (target / "Settings/b.json").read_text() == "b"
+    assert not journal.exists()
+
+
+def test_delta_restore_skips_identical_files(tmp_path):
+    backup_dir = make_backup_folder(tmp_path / "backup", {"Settings/a.json": "a", "Settings/b.json": "b"})
+    target = tmp_path / "target"
+    shutil.copytree(backup_dir / "Settings", target / "Settings")
+    for name in ("a.json", "b.json"):
+        shutil.copystat(backup_dir / "Settings" / name, target / "Settings" / name)
+    write(target / "Settings/b.json", "B")
+    
+    engine = seylabicode.RestoreEngine(seylabicode.BackupReader(backup_dir),
+                                       lambda relative: target / relative, tmp_path / "restore.journal")
+    stats = engine.run()
+    
+    assert (stats['files'], stats['skipped']) == (1, 1)
+    assert (target / "Settings/b.json").read_text() == "b"
+
+
+def test_incremental_backup_links_unchanged_files(make_tool, profile):
+    settings = write(Path(profile['APPDATA']) / "Code" / "User" / "settings.json", '{"a": 1}')
+    first = make_tool()
+    first.create_advanced_backup()
+    second = make_tool(backup_mode="incremental")
+    second.create_advanced_backup()
+    
+    relative = "Settings/Code/settings.json"
+    with open(second.backup_dir / "file_manifest.json") as f:
+        manifest = json.load(f)
+    assert manifest['mode'] == "incremental"
+    assert manifest['files'][relative]['size'] == settings.stat().st_size
+    assert os.path.samefile(first.backup_dir / relative, second.backup_dir / relative)
+
+
+def test_archive_manifest_locates_members_without_the_central_directory(make_tool, profile, monkeypatch):
+    write(Path(profile['APPDATA']) / "Code" / "User" / "settings.json", '{"a": 1}')
+    tool = make_tool(backup_mode="archive")
+    tool.create_advanced_backup()
+    
+    reader = seylabicode.BackupReader(tool.backup_dir)
+    entry = reader.files["Settings/Code/settings.json"]
+    assert entry['archived'] and {'offset', 'compressed_size', 'method'} <= set(entry)
+    monkeypatch.setattr(reader, '_zip', None)
+    with reader.open("Settings/Code/settings.json") as f:
+        assert f.read() == b'{"a": 1}'
+
+
+@pytest.mark.parametrize("mode", ["full", "store", "archive"])
+def test_lean_restore_skips_extensions_without_a_cached_vsix(make_tool, profile, mode):
+    vscode = Path(profile['USERPROFILE']) / ".vscode"
+    extensions = vscode / "extensions"
+    for folder, publisher, name in (("acme.kept-1.0.0", "acme", "kept"), ("acme.lost-1.0.0", "acme", "lost")):
+        write(extensions / folder / "package.json",
+              json.dumps({'publisher': publisher, 'name': name, 'version': "1.0.0"}))
+        write(extensions / folder / "dist" / "main.js", "code")
+    write(extensions / "extensions.json", json.dumps([
+        {'identifier': {'id': "acme.kept"}, 'relativeLocation': "acme.kept-1.0.0"},
+        {'identifier': {'id': "acme.lost"}, 'relativeLocation': "acme.lost-1.0.0"},
+    ]))
+    # VSCode keeps the VSIX cache in the user data folder, not beside the extensions
+    vsix_cache = Path(profile['APPDATA']) / "Code" / "CachedExtensionVSIXs"
+    with zipfile.ZipFile(write(vsix_cache / "acme.kept-1.0.0", b""), 'w') as vsix:
+        vsix.writestr("extension/package.json", '{"name": "kept"}')
+        vsix.writestr("extension/dist/main.js", "code")
+    
+    tool = make_tool(lean_extensions=True, backup_mode=mode)
+    tool.create_advanced_backup()
+    # Removal deletes the cache too, so restore must use the copy in the backup
+    shutil.rmtree(extensions)
+    shutil.rmtree(vsix_cache)
+    assert tool.restore_from_backup(tool.backup_dir)
+    
+    assert (extensions / "acme.kept-1.0.0" / "dist" / "main.js").read_text() == "code"
+    assert not (extensions / "acme.lost-1.0.0").exists()
+    with open(extensions / "extensions.json") as f:
+        assert [item['relativeLocation'] for item in json.load(f)] == ["acme.kept-1.0.0"]
+
+
+@pytest.mark.parametrize("mode", ["full", "store", "archive"])
+def test_empty_folders_are_backed_up_and_restored(make_tool, profile, mode):
+    user = Path(profile['APPDATA']) / "Code" / "User"
+    write(user / "settings.json", "{}")
+    (user / "snippets").mkdir()
+    tool = make_tool(backup_mode=mode)
+    tool.create_advanced_backup()
+    shutil.rmtree(user)
+    
+    assert tool.restore_from_backup(tool.backup_dir)
+    
+    assert (user / "snippets").is_dir()
+    assert (user / "settings.json").read_text() == "{}"
+
+
+def test_restore_destinations_follow_the_tool_environment(make_tool, profile):
+    tool = make_tool()
+    
+    assert tool._restore_destination("Settings/Code/settings.json", {}) == \
+        Path(profile['APPDATA']) / "Code" / "User" / "settings.json"
+    assert tool._restore_destination("Extensions/.vscode/extensions.json", {}) == \
+        Path(profile['USERPROFILE']) / ".vscode" / "extensions" / "extensions.json"
+
+
+def test_archive_member_without_an_offset_is_an_error(make_tool, profile):
+    write(Path(profile['APPDATA']) / "Code" / "User" / "settings.json", '{"a": 1}')
+    tool = make_tool(backup_mode="archive")
+    tool.create_advanced_backup()
+    
+    reader = seylabicode.BackupReader(tool.backup_dir)
+    del reader.files["Settings/Code/settings.json"]['offset']
+    with pytest.raises(zipfile.BadZipFile):
+        reader.open("Settings/Code/settings.json")
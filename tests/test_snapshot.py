@@ -0,0 +1,62 @@
+"""Snapshot backups that reflink or hard-link files"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import seylabicode
+from conftest import write
+
+
+@pytest.mark.skipif(not seylabicode.REFLINK_AVAILABLE, reason="reflinks are only attempted on Linux")
+def test_failed_reflink_never_truncates_a_hard_linked_destination(tmp_path, monkeypatch):
+    source = write(tmp_path / "state.vscdb", b"live data")
+    destination = tmp_path / "backup" / "state.vscdb"
+    destination.parent.mkdir()
+    os.link(source, destination)
+    
+    def unsupported(*args):
+        raise OSError("Operation not supported")
+    
+    monkeypatch.setattr(seylabicode.fcntl, 'ioctl', unsupported)
+    assert not seylabicode._reflink_file(source, destination)
+    assert source.read_bytes() == b"live data"
+    assert sorted(p.name for p in destination.parent.iterdir()) == ["state.vscdb"]
+
+
+def test_snapshot_rerun_into_the_same_folder_keeps_the_source(make_tool, profile):
+    source = write(Path(profile['APPDATA']) / "Code" / "User" / "settings.json", '{"a": 1}')
+    tool = make_tool(backup_mode="snapshot")
+    tool._snapshot_hardlinks = True
+    destination = tool.backup_dir / "settings.json"
+    
+    first = tool._snapshot_file(source, destination)
+    second = tool._snapshot_file(source, destination)
+    assert first in ("reflink", "hardlink") and second in ("reflink", "hardlink")
+    assert source.read_text() == '{"a": 1}'
+    assert destination.read_text() == '{"a": 1}'
+
+
+def test_machine_id_reset_after_a_snapshot_keeps_the_backup_intact(make_tool, profile):
+    user = Path(profile['APPDATA']) / "Code" / "User"
+    storage = write(user / "globalStorage" / "storage.json", '{"machineId": "abc", "theme": "dark"}')
+    write(user / "state.vscdb", b"state")
+    tool = make_tool(backup_mode="snapshot")
+    
+    tool.create_advanced_backup(removing=True)
+    tool._clear_machine_id_files()
+    
+    assert "machineId" not in json.loads(storage.read_text())
+    for backup in tool.backup_dir.rglob("storage.json"):
+        assert json.loads(backup.read_text())["machineId"] == "abc"
+    assert tool.verify_backup(tool.backup_dir)
+
+
+def test_snapshot_without_removal_never_hard_links(make_tool, profile):
+    source = write(Path(profile['APPDATA']) / "Code" / "User" / "settings.json", '{"a": 1}')
+    tool = make_tool(backup_mode="snapshot")
+    
+    tool.create_advanced_backup()
+    backup = next(tool.backup_dir.rglob("settings.json"))
+    assert not os.path.samefile(source, backup)
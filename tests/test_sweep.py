@@ -0,0 +1,61 @@
+"""Multi-user sweeps"""
+from pathlib import Path
+
+import pytest
+
+import seylabicode
+from conftest import make_profile, write
+
+
+@pytest.fixture
+def users_root(tmp_path):
+    root = tmp_path / "Users"
+    for name in ("alice", "bob"):
+        environment = make_profile(root / name)
+        write(Path(environment['APPDATA']) / "Code" / "User" / "settings.json", "{}")
+        write(Path(environment['LOCALAPPDATA']) / "Microsoft" / "VSCode" / "cache.bin", "c" * 100)
+        write(Path(environment['TEMP']) / "vscode-inno-updater-1.log", "u" * 10)
+        write(Path(environment['TEMP']) / "data.txt", "keep me")
+    (root / "Public" / "AppData").mkdir(parents=True)
+    return root
+
+
+def test_sweep_measures_every_profile(make_tool, users_root):
+    stats = make_tool().sweep_user_profiles(users_root)
+    
+    assert sorted(stats) == ["alice", "bob"]
+    for profile in stats.values():
+        assert profile['products'] == ["vscode"]
+        assert profile['categories']['caches'] == {'bytes': 110, 'files': 2}
+        assert profile['errors'] == []
+
+
+def test_sweep_removal_requires_confirmation(make_tool, users_root):
+    with pytest.raises(RuntimeError):
+        make_tool().sweep_user_profiles(users_root, remove_mode="ultimate")
+    assert (users_root / "alice" / "AppData" / "Roaming" / "Code").is_dir()
+
+
+@pytest.mark.parametrize("background_purge", [False, True])
+def test_sweep_removal_leaves_temp_alone(make_tool, users_root, background_purge):
+    tool = make_tool(background_purge=background_purge)
+    stats = tool.sweep_user_profiles(users_root, remove_mode="ultimate", confirmed=True)
+    tool._finish_background_purge()
+    
+    for name in ("alice", "bob"):
+        environment = seylabicode.user_profile_environment(users_root / name)
+        assert stats[name]['directories_removed'] == 2
+        assert not (Path(environment['APPDATA']) / "Code").exists()
+        assert not (Path(environment['LOCALAPPDATA']) / "Microsoft" / "VSCode").exists()
+        assert (Path(environment['TEMP']) / "data.txt").read_text(encoding='utf-8') == "keep me"
+
+
+def test_profile_folders_are_never_removed(make_tool, profile, monkeypatch):
+    paths = seylabicode.PathDiscovery(['vscode'], profile)
+    monkeypatch.setattr(paths, 'removal_targets', lambda mode: [Path(profile['TEMP']), Path(profile['USERPROFILE'])])
+    write(Path(profile['TEMP']) / "data.txt")
+    
+    removed = make_tool(background_purge=False)._remove_directories_of(paths, "ultimate")
+    
+    assert removed['directories'] == 0
+    assert (Path(profile['TEMP']) / "data.txt").exists()